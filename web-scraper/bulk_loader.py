@@ -0,0 +1,366 @@
+"""
+Bulk Loader for Udyam submissions
+Streams validated records into the udyam_submissions table with batched upserts keyed on aadhaarNumber
+"""
+
+import argparse
+import csv
+import io
+import json
+import logging
+import os
+import sqlite3
+import uuid
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Any, Iterator, Optional
+
+from field_rules import RecordValidator, load_schema
+
+logger = logging.getLogger(__name__)
+
+TABLE_NAME = "udyam_submissions"
+CONFLICT_KEY = "aadhaarNumber"
+
+# Columns of the UdyamSubmission model (backend/prisma/schema.prisma)
+SUBMISSION_COLUMNS = [
+    "id", "createdAt", "updatedAt",
+    "aadhaarNumber", "mobileNumber", "otpVerified",
+    "panNumber", "enterpriseName", "enterpriseType", "commencementDate",
+    "address", "pincode", "state", "district", "emailId",
+    "currentStep", "isComplete", "submissionId",
+    "ipAddress", "userAgent"
+]
+
+# Generated once per row and never overwritten by a later upsert
+INSERT_ONLY_COLUMNS = {"id", "createdAt", "submissionId"}
+
+UPDATE_COLUMNS = [c for c in SUBMISSION_COLUMNS if c not in INSERT_ONLY_COLUMNS and c != CONFLICT_KEY]
+
+DEFAULT_BATCH_SIZE = 10000
+
+
+def iter_records(path: str) -> Iterator[Dict[str, Any]]:
+    """Stream records from a JSONL or CSV file"""
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        if path.endswith(".csv"):
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def partition_of(record: Dict[str, Any], partitions: int) -> int:
+    """Stable partition for a record so one Aadhaar number is always loaded by one worker"""
+    return zlib.crc32(str(record.get(CONFLICT_KEY, "")).encode()) % partitions
+
+
+def to_row(record: Dict[str, Any], now: str) -> List[Any]:
+    """Map a validated record onto SUBMISSION_COLUMNS, filling the Prisma client-side defaults"""
+    generated = {
+        "id": uuid.uuid4().hex,
+        "submissionId": uuid.uuid4().hex,
+        "createdAt": now,
+        "updatedAt": now,
+        "otpVerified": False,
+        "currentStep": 2,
+        "isComplete": True
+    }
+    row = []
+    for column in SUBMISSION_COLUMNS:
+        value = record.get(column)
+        if value is None or (value == "" and column == "emailId"):
+            value = generated.get(column)
+        row.append(value)
+    return row
+
+
+class SQLiteBackend:
+    def __init__(self, path: str):
+        """SQLite stand-in for the PostgreSQL table, used for tests and local dry runs"""
+        self.conn = sqlite3.connect(path, timeout=60)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+
+    def ensure_schema(self):
+        columns = ", ".join(f'"{c}" TEXT' for c in SUBMISSION_COLUMNS if c != "id")
+        self.conn.execute(f'CREATE TABLE IF NOT EXISTS {TABLE_NAME} ("id" TEXT PRIMARY KEY, {columns})')
+        self.conn.execute(
+            f'CREATE UNIQUE INDEX IF NOT EXISTS "{TABLE_NAME}_{CONFLICT_KEY}_key" '
+            f'ON {TABLE_NAME} ("{CONFLICT_KEY}")'
+        )
+        self.conn.commit()
+
+    def upsert(self, rows: List[List[Any]]):
+        columns = ", ".join(f'"{c}"' for c in SUBMISSION_COLUMNS)
+        placeholders = ", ".join("?" for _ in SUBMISSION_COLUMNS)
+        updates = ", ".join(f'"{c}" = excluded."{c}"' for c in UPDATE_COLUMNS)
+        self.conn.executemany(
+            f'INSERT INTO {TABLE_NAME} ({columns}) VALUES ({placeholders}) '
+            f'ON CONFLICT ("{CONFLICT_KEY}") DO UPDATE SET {updates}',
+            rows
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+class PostgresBackend:
+    def __init__(self, dsn: str):
+        """COPY each batch into a temporary staging table, then upsert it in one statement"""
+        try:
+            import psycopg2
+        except ImportError:
+            raise ImportError("psycopg2 is required for PostgreSQL loading: pip install psycopg2-binary")
+        self.conn = psycopg2.connect(dsn)
+
+    def ensure_schema(self):
+        # The table itself is created by Prisma; only the upsert key is guaranteed here
+        with self.conn.cursor() as cur:
+            cur.execute(
+                f'CREATE UNIQUE INDEX IF NOT EXISTS "{TABLE_NAME}_{CONFLICT_KEY}_key" '
+                f'ON {TABLE_NAME} ("{CONFLICT_KEY}")'
+            )
+        self.conn.commit()
+
+    def upsert(self, rows: List[List[Any]]):
+        columns = ", ".join(f'"{c}"' for c in SUBMISSION_COLUMNS)
+        updates = ", ".join(f'"{c}" = EXCLUDED."{c}"' for c in UPDATE_COLUMNS)
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow(["\\N" if v is None else v for v in row])
+        buffer.seek(0)
+
+        with self.conn.cursor() as cur:
+            cur.execute(
+                f"CREATE TEMP TABLE IF NOT EXISTS staging (LIKE {TABLE_NAME} INCLUDING DEFAULTS) "
+                f"ON COMMIT DELETE ROWS"
+            )
+            cur.copy_expert(
+                f"COPY staging ({columns}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer
+            )
+            # A batch may repeat an Aadhaar number; keep the last occurrence
+            cur.execute(
+                f"INSERT INTO {TABLE_NAME} ({columns}) "
+                f"SELECT DISTINCT ON (\"{CONFLICT_KEY}\") {columns} FROM staging "
+                f"ORDER BY \"{CONFLICT_KEY}\", ctid DESC "
+                f"ON CONFLICT (\"{CONFLICT_KEY}\") DO UPDATE SET {updates}"
+            )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+def open_backend(dsn: Optional[str] = None, sqlite_path: Optional[str] = None):
+    """Create the backend named by a PostgreSQL DSN or an SQLite path"""
+    if dsn:
+        return PostgresBackend(dsn)
+    if sqlite_path:
+        return SQLiteBackend(sqlite_path)
+    raise ValueError("Either a PostgreSQL DSN or an SQLite path is required")
+
+
+def source_fingerprint(path: str) -> str:
+    """Identify a source file's contents by path, size and modification time"""
+    stat = Path(path).stat()
+    return f"{Path(path).resolve()}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+class BulkLoader:
+    def __init__(self, backend, validator: RecordValidator, batch_size: int = DEFAULT_BATCH_SIZE,
+                 checkpoint_file: Optional[str] = None, rejects_file: Optional[str] = None):
+        """Validate and load records in batches, checkpointing after every committed batch"""
+        self.backend = backend
+        self.validator = validator
+        self.batch_size = batch_size
+        self.checkpoint_file = Path(checkpoint_file) if checkpoint_file else None
+        self.rejects_file = rejects_file
+
+    def _read_checkpoint(self, source_key: str) -> Dict[str, int]:
+        if self.checkpoint_file is None or not self.checkpoint_file.exists():
+            return {"records_done": 0, "rejects_bytes": 0}
+        checkpoint = json.loads(self.checkpoint_file.read_text())
+        if checkpoint.get("source") != source_key:
+            return {"records_done": 0, "rejects_bytes": 0}
+        return {"records_done": checkpoint["records_done"], "rejects_bytes": checkpoint.get("rejects_bytes", 0)}
+
+    def _write_checkpoint(self, source_key: str, records_done: int, rejects_bytes: int):
+        if self.checkpoint_file is None:
+            return
+        tmp = self.checkpoint_file.with_suffix(".tmp")
+        tmp.write_text(json.dumps({
+            "source": source_key, "records_done": records_done, "rejects_bytes": rejects_bytes
+        }))
+        tmp.replace(self.checkpoint_file)
+
+    def load(self, source: str, source_key: Optional[str] = None) -> Dict[str, int]:
+        """
+        Load one file, resuming after the last checkpointed record.
+
+        Checkpoints are keyed on `source_key` (by default the file's path, size and
+        mtime), so a different file at the same path starts from the beginning.
+        """
+        source_key = source_key or source_fingerprint(source)
+        checkpoint = self._read_checkpoint(source_key)
+        skip = checkpoint["records_done"]
+        if skip:
+            logger.info(f"Resuming {source} after {skip} records")
+
+        stats = {"loaded": 0, "rejected": 0, "skipped": skip}
+        now = datetime.now(timezone.utc).isoformat()
+        batch: List[List[Any]] = []
+        position = 0
+
+        rejects = open(self.rejects_file, 'a', encoding='utf-8') if self.rejects_file else None
+        if rejects is not None and self.checkpoint_file is not None:
+            # Drop rejects written after the checkpoint; those records are validated again
+            rejects.truncate(checkpoint["rejects_bytes"])
+            rejects.seek(checkpoint["rejects_bytes"])
+        try:
+            for record in iter_records(source):
+                position += 1
+                if position <= skip:
+                    continue
+
+                errors = self.validator.validate(record)
+                if errors:
+                    stats["rejected"] += 1
+                    if rejects is not None:
+                        rejects.write(json.dumps({"record": record, "errors": errors}) + "\n")
+                    continue
+
+                batch.append(to_row(record, now))
+                if len(batch) >= self.batch_size:
+                    self.backend.upsert(batch)
+                    stats["loaded"] += len(batch)
+                    batch = []
+                    self._write_checkpoint(source_key, position, self._rejects_bytes(rejects))
+
+            if batch:
+                self.backend.upsert(batch)
+                stats["loaded"] += len(batch)
+            self._write_checkpoint(source_key, position, self._rejects_bytes(rejects))
+        finally:
+            if rejects is not None:
+                rejects.close()
+
+        return stats
+
+    @staticmethod
+    def _rejects_bytes(rejects) -> int:
+        if rejects is None:
+            return 0
+        rejects.flush()
+        # tell() is a text-mode cookie and can lag a truncate; the file size is what resume truncates to
+        return os.fstat(rejects.fileno()).st_size
+
+
+def partition_file(source: str, partitions: int, work_dir: str,
+                   source_key: Optional[str] = None) -> List[str]:
+    """Split a source file into per-partition JSONL files by Aadhaar number"""
+    out_dir = Path(work_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    paths = [str(out_dir / f"part-{i:04d}.jsonl") for i in range(partitions)]
+
+    # Partitioning is deterministic, so a finished split of the same source can be reused on resume
+    source_key = source_key or source_fingerprint(source)
+    marker = out_dir / "partitioned.json"
+    if marker.exists() and json.loads(marker.read_text()) == {"source": source_key, "partitions": partitions}:
+        return paths
+
+    # Partitions, checkpoints and rejects of an earlier split describe other data
+    marker.unlink(missing_ok=True)
+    for stale in out_dir.glob("part-*"):
+        stale.unlink()
+
+    handles = [open(p, 'w', encoding='utf-8') for p in paths]
+    try:
+        for record in iter_records(source):
+            handles[partition_of(record, partitions)].write(json.dumps(record) + "\n")
+    finally:
+        for handle in handles:
+            handle.close()
+
+    marker.write_text(json.dumps({"source": source_key, "partitions": partitions}))
+    return paths
+
+
+def _load_partition(part: str, source_key: str, state_prefix: str, schema_file: str, batch_size: int,
+                    dsn: Optional[str], sqlite_path: Optional[str]) -> Dict[str, int]:
+    backend = open_backend(dsn, sqlite_path)
+    try:
+        validator = RecordValidator(load_schema(schema_file), fields=SUBMISSION_COLUMNS)
+        loader = BulkLoader(
+            backend, validator, batch_size,
+            checkpoint_file=state_prefix + ".checkpoint",
+            rejects_file=state_prefix + ".rejects.jsonl"
+        )
+        return loader.load(part, source_key)
+    finally:
+        backend.close()
+
+
+def load_parallel(source: str, workers: int, work_dir: str, schema_file: str,
+                  batch_size: int = DEFAULT_BATCH_SIZE, dsn: Optional[str] = None,
+                  sqlite_path: Optional[str] = None) -> Dict[str, int]:
+    """
+    Hash-partition the source by Aadhaar number and load each partition in its own process.
+
+    Disjoint partitions mean concurrent upserts never touch the same row, so workers
+    cannot deadlock on each other. Each partition keeps its own checkpoint, keyed on
+    the original source so a new dump in the same work directory loads from scratch.
+    """
+    source_key = source_fingerprint(source)
+    backend = open_backend(dsn, sqlite_path)
+    backend.ensure_schema()
+    backend.close()
+
+    if workers == 1:
+        Path(work_dir).mkdir(parents=True, exist_ok=True)
+        return _load_partition(source, source_key, str(Path(work_dir) / "single"), schema_file,
+                               batch_size, dsn, sqlite_path)
+
+    parts = partition_file(source, workers, work_dir, source_key)
+    totals = {"loaded": 0, "rejected": 0, "skipped": 0}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_load_partition, part, f"{source_key}#{Path(part).name}", part,
+                        schema_file, batch_size, dsn, sqlite_path)
+            for part in parts
+        ]
+        for future in futures:
+            for key, value in future.result().items():
+                totals[key] += value
+    return totals
+
+
+def main():
+    """Load a JSONL/CSV dump of submissions into the database"""
+    parser = argparse.ArgumentParser(description="Bulk load Udyam submissions")
+    parser.add_argument("source", help="JSONL or CSV file of submission records")
+    parser.add_argument("--dsn", help="PostgreSQL connection string (defaults to SQLite)")
+    parser.add_argument("--sqlite", default="udyam_submissions.db", help="SQLite database path")
+    parser.add_argument("--schema", default="udyam_form_schema.json", help="Scraped schema file")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--work-dir", default=".bulk_load", help="Partitions and checkpoints")
+    args = parser.parse_args()
+
+    sqlite_path = None if args.dsn else args.sqlite
+    totals = load_parallel(
+        args.source, args.workers, args.work_dir, args.schema,
+        batch_size=args.batch_size, dsn=args.dsn, sqlite_path=sqlite_path
+    )
+    logger.info(f"Loaded {totals['loaded']} records, rejected {totals['rejected']}, "
+                f"resumed past {totals['skipped']}")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,379 @@
+"""
+Columnar Export of Udyam submissions
+Derives an Arrow schema from the scraped form schema and writes partitioned, compressed Parquet
+"""
+
+import argparse
+import json
+import logging
+import re
+import shutil
+from datetime import date, datetime
+from itertools import islice
+from pathlib import Path
+from typing import Dict, List, Any, Callable, Iterable, Iterator, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from bulk_loader import SUBMISSION_COLUMNS, iter_records
+from field_rules import iter_fields, load_schema
+from option_index import load_options
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 100000
+DEFAULT_PARTITION_BY = ["state"]
+
+# Patterns like ^[0-9]{12}$ or ^[6-9][0-9]{9}$: digits only, so the value fits an integer
+_DIGITS_PATTERN = re.compile(r"^\^(\[[0-9-]+\](\{\d+\})?)+\$$")
+
+# Fixed-width digit strings are stored as integers; this metadata key records the
+# width so readers can restore leading zeros
+WIDTH_METADATA = b"udyam.digits"
+
+_DATE_PREFIX = re.compile(r"^\d{4}-\d{2}-\d{2}")
+
+_ASCII_INTEGER = re.compile(r"^[+-]?[0-9]+$")
+
+_CATEGORY = pa.dictionary(pa.int32(), pa.string())
+_TIMESTAMP = pa.timestamp("ms", tz="UTC")
+
+# Types for submission columns the scraped form schema does not describe: the
+# server-filled audit and progress columns, and form fields a partial scrape missed
+COLUMN_TYPES = {
+    "id": pa.string(),
+    "createdAt": _TIMESTAMP,
+    "updatedAt": _TIMESTAMP,
+    "otpVerified": pa.bool_(),
+    "enterpriseType": _CATEGORY,
+    "commencementDate": pa.date32(),
+    "state": _CATEGORY,
+    "district": _CATEGORY,
+    "currentStep": pa.int8(),
+    "isComplete": pa.bool_(),
+    "submissionId": pa.string(),
+    "ipAddress": pa.string(),
+    "userAgent": pa.string()
+}
+
+# Widths of the fixed-width digit columns, used when the form schema lacks the field
+DIGIT_WIDTHS = {
+    "aadhaarNumber": 12,
+    "mobileNumber": 10,
+    "pincode": 6
+}
+
+
+def _digits_type(width: int) -> pa.DataType:
+    return pa.uint32() if width <= 9 else pa.uint64()
+
+
+def _arrow_type(field: Dict[str, Any]) -> Tuple[pa.DataType, Optional[int]]:
+    """Arrow type for a form field, plus the digit width for fixed-width numeric strings"""
+    field_type = field.get('type', 'text')
+    validation = field.get('validation', {})
+    pattern = validation.get('pattern') or ""
+    width = validation.get('minLength')
+
+    if width and width == validation.get('maxLength') and _DIGITS_PATTERN.match(pattern):
+        return _digits_type(width), width
+    if field_type in ('select', 'radio'):
+        return _CATEGORY, None
+    if field_type == 'date':
+        return pa.date32(), None
+    if field_type == 'checkbox':
+        return pa.bool_(), None
+    if field_type == 'number':
+        return pa.float64(), None
+    return pa.string(), None
+
+
+def derive_arrow_schema(schema: Dict[str, Any]) -> pa.Schema:
+    """Arrow schema for every submission column, typed from the scraped form schema where it has the field"""
+    form_fields = {field['name']: field for field in iter_fields(schema)}
+    fields = []
+    for name in SUBMISSION_COLUMNS:
+        if name in form_fields:
+            arrow_type, width = _arrow_type(form_fields[name])
+        elif name in DIGIT_WIDTHS:
+            arrow_type, width = _digits_type(DIGIT_WIDTHS[name]), DIGIT_WIDTHS[name]
+        else:
+            arrow_type, width = COLUMN_TYPES.get(name, pa.string()), None
+        metadata = {WIDTH_METADATA: str(width).encode()} if width else None
+        fields.append(pa.field(name, arrow_type, nullable=True, metadata=metadata))
+    return pa.schema(fields)
+
+
+def _partitioning(arrow_schema: pa.Schema, partition_by: List[str]) -> Optional[ds.Partitioning]:
+    if not partition_by:
+        return None
+    # Partition values live in directory names, so they are declared as plain strings
+    return ds.partitioning(pa.schema([(name, pa.string()) for name in partition_by]), flavor="hive")
+
+
+def _file_schema(arrow_schema: pa.Schema, partition_by: List[str]) -> pa.Schema:
+    for name in partition_by:
+        index = arrow_schema.get_field_index(name)
+        arrow_schema = arrow_schema.set(index, arrow_schema.field(name).with_type(pa.string()))
+    return arrow_schema
+
+
+def _integer(value: Any, arrow_type: pa.DataType, width: Optional[int] = None) -> Optional[int]:
+    """
+    Parse an integer column value, raising ValueError if it does not fit the column.
+
+    Whitespace is ignored ("1234 5678 9012" is a valid Aadhaar number). Fixed-width
+    digit columns take exactly `width` digits, so restoring leading zeros is lossless.
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, int) and width:
+        text = str(value).zfill(width)
+    else:
+        text = "".join(str(value).split())
+    if not text:
+        return None
+
+    if not _ASCII_INTEGER.match(text):
+        raise ValueError("Not an integer")
+    if width and (len(text) != width or not text.isdigit()):
+        raise ValueError(f"Expected {width} digits")
+
+    number = int(text)
+    bits = arrow_type.bit_width
+    low, high = (-(1 << (bits - 1)), (1 << (bits - 1)) - 1) if pa.types.is_signed_integer(arrow_type) \
+        else (0, (1 << bits) - 1)
+    if not low <= number <= high:
+        raise ValueError(f"Out of range for {arrow_type}")
+    return number
+
+
+def _convert(value: Any, arrow_type: pa.DataType) -> Any:
+    if value is None or value == "":
+        return None
+    try:
+        if pa.types.is_timestamp(arrow_type):
+            return datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        if pa.types.is_date(arrow_type):
+            match = _DATE_PREFIX.match(str(value))
+            return date.fromisoformat(match.group(0)) if match else None
+        if pa.types.is_boolean(arrow_type):
+            return value if isinstance(value, bool) else str(value).lower() in ("true", "1", "yes")
+        if pa.types.is_floating(arrow_type):
+            return float(value)
+    except ValueError:
+        return None
+    return str(value)
+
+
+class DictionaryEncoder:
+    def __init__(self, seed: Iterable[str] = ()):
+        """
+        Dictionary shared by every batch of a column, seeded with the select's options.
+
+        Parquet keeps dictionary encoding only while consecutive batches carry an equal
+        dictionary, so the dictionary grows append-only instead of being rebuilt per batch.
+        """
+        self.values: List[str] = []
+        self.positions: Dict[str, int] = {}
+        self._dictionary: Optional[pa.Array] = None
+        for value in seed:
+            self._position(value)
+
+    def _position(self, value: str) -> int:
+        position = self.positions.get(value)
+        if position is None:
+            position = len(self.values)
+            self.positions[value] = position
+            self.values.append(value)
+            self._dictionary = None
+        return position
+
+    def encode(self, values: List[Optional[str]]) -> pa.DictionaryArray:
+        indices = pa.array([None if v is None else self._position(v) for v in values], type=pa.int32())
+        if self._dictionary is None:
+            self._dictionary = pa.array(self.values, type=pa.string())
+        return pa.DictionaryArray.from_arrays(indices, self._dictionary)
+
+
+def iter_batches(records: Iterable[Dict[str, Any]], file_schema: pa.Schema, schema: Dict[str, Any],
+                 batch_size: int = DEFAULT_BATCH_SIZE,
+                 on_reject: Optional[Callable[[Dict[str, Any], Dict[str, str]], None]] = None
+                 ) -> Iterator[pa.RecordBatch]:
+    """
+    Convert a record stream into Arrow record batches of up to `batch_size` rows.
+
+    Records with a value that does not fit an integer column are left out and passed
+    to `on_reject` with field name -> error, rather than being exported with a null.
+    """
+    options = {
+        field['name']: [o.get('value') for o in load_options(field) or [] if o.get('value')]
+        for field in iter_fields(schema)
+    }
+    encoders = {
+        field.name: DictionaryEncoder(options.get(field.name, []))
+        for field in file_schema if pa.types.is_dictionary(field.type)
+    }
+
+    integers = {
+        field.name: int(field.metadata[WIDTH_METADATA]) if field.metadata and WIDTH_METADATA in field.metadata else None
+        for field in file_schema if pa.types.is_integer(field.type)
+    }
+
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, batch_size))
+        if not chunk:
+            return
+
+        rows = []
+        for record in chunk:
+            parsed, errors = {}, {}
+            for name, width in integers.items():
+                try:
+                    parsed[name] = _integer(record.get(name), file_schema.field(name).type, width)
+                except ValueError as e:
+                    errors[name] = str(e)
+            if errors:
+                if on_reject is not None:
+                    on_reject(record, errors)
+                continue
+            rows.append({**record, **parsed})
+        if not rows:
+            continue
+        chunk = rows
+
+        columns = []
+        for field in file_schema:
+            if field.name in encoders:
+                values = [_convert(r.get(field.name), pa.string()) for r in chunk]
+                columns.append(encoders[field.name].encode(values))
+            elif field.name in integers:
+                columns.append(pa.array([r[field.name] for r in chunk], type=field.type))
+            else:
+                values = [_convert(r.get(field.name), field.type) for r in chunk]
+                columns.append(pa.array(values, type=field.type))
+        yield pa.RecordBatch.from_arrays(columns, schema=file_schema)
+
+
+def export_submissions(source: str, output_dir: str, schema: Dict[str, Any],
+                       partition_by: Optional[List[str]] = None,
+                       batch_size: int = DEFAULT_BATCH_SIZE, compression: str = "zstd",
+                       overwrite: bool = False, rejects_file: Optional[str] = None) -> Dict[str, int]:
+    """
+    Stream a JSONL/CSV dump into a hive-partitioned Parquet dataset.
+
+    The output directory must be empty, since files left from an earlier export would
+    be read back as part of this one; `overwrite` removes it first. Records whose
+    digit or integer values do not fit are counted and, with `rejects_file`, written
+    there with their errors.
+    """
+    output = Path(output_dir)
+    if output.exists() and any(output.iterdir()):
+        if not overwrite:
+            raise FileExistsError(f"{output_dir} is not empty; pass overwrite=True to replace it")
+        shutil.rmtree(output)
+
+    partition_by = DEFAULT_PARTITION_BY if partition_by is None else partition_by
+    arrow_schema = derive_arrow_schema(schema)
+    partition_by = [name for name in partition_by if name in arrow_schema.names]
+    file_schema = _file_schema(arrow_schema, partition_by)
+
+    stats = {"exported": 0, "rejected": 0}
+    rejects = open(rejects_file, 'w', encoding='utf-8') if rejects_file else None
+
+    def reject(record: Dict[str, Any], errors: Dict[str, str]):
+        stats["rejected"] += 1
+        if rejects is not None:
+            rejects.write(json.dumps({"record": record, "errors": errors}) + "\n")
+
+    def counted(batches: Iterator[pa.RecordBatch]) -> Iterator[pa.RecordBatch]:
+        for batch in batches:
+            stats["exported"] += batch.num_rows
+            yield batch
+
+    parquet_format = ds.ParquetFileFormat()
+    try:
+        ds.write_dataset(
+            counted(iter_batches(iter_records(source), file_schema, schema, batch_size, reject)),
+            output_dir,
+            schema=file_schema,
+            format=parquet_format,
+            file_options=parquet_format.make_write_options(compression=compression),
+            partitioning=_partitioning(arrow_schema, partition_by),
+            max_rows_per_group=batch_size
+        )
+    finally:
+        if rejects is not None:
+            rejects.close()
+    return stats
+
+
+def open_dataset(output_dir: str, schema: Dict[str, Any],
+                 partition_by: Optional[List[str]] = None) -> ds.Dataset:
+    """Open an exported dataset; filters on it prune partitions and row groups"""
+    partition_by = DEFAULT_PARTITION_BY if partition_by is None else partition_by
+    arrow_schema = derive_arrow_schema(schema)
+    partition_by = [name for name in partition_by if name in arrow_schema.names]
+    return ds.dataset(output_dir, format="parquet",
+                      partitioning=_partitioning(arrow_schema, partition_by))
+
+
+def read_submissions(output_dir: str, schema: Dict[str, Any],
+                     filters: Optional[Dict[str, Any]] = None, columns: Optional[List[str]] = None,
+                     partition_by: Optional[List[str]] = None, restore_digits: bool = True):
+    """
+    Read an exported dataset into pandas with equality filters pushed down to Parquet.
+
+    Filter values for fixed-width digit fields may be given as strings; they are
+    converted to the stored integers. With `restore_digits` those columns come back
+    as zero-padded strings.
+    """
+    dataset = open_dataset(output_dir, schema, partition_by)
+
+    expression = None
+    for name, value in (filters or {}).items():
+        field = dataset.schema.field(name)
+        if field.metadata and WIDTH_METADATA in field.metadata:
+            value = _integer(value, field.type, int(field.metadata[WIDTH_METADATA]))
+        condition = pc.field(name) == value
+        expression = condition if expression is None else expression & condition
+
+    df = dataset.to_table(columns=columns, filter=expression).to_pandas()
+
+    if restore_digits:
+        for field in dataset.schema:
+            if field.name in df.columns and field.metadata and WIDTH_METADATA in field.metadata:
+                width = int(field.metadata[WIDTH_METADATA])
+                df[field.name] = df[field.name].map(
+                    lambda v: None if v is None or v != v else str(int(v)).zfill(width)
+                )
+    return df
+
+
+def main():
+    """Export a submission dump to partitioned Parquet"""
+    parser = argparse.ArgumentParser(description="Export Udyam submissions to Parquet")
+    parser.add_argument("source", help="JSONL or CSV file of submission records")
+    parser.add_argument("--output", default="submissions_parquet", help="Dataset directory")
+    parser.add_argument("--schema", default="udyam_form_schema.json", help="Scraped schema file")
+    parser.add_argument("--partition-by", nargs="*", default=DEFAULT_PARTITION_BY)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--compression", default="zstd")
+    parser.add_argument("--overwrite", action="store_true", help="Replace an existing dataset")
+    parser.add_argument("--rejects", default=None, help="JSONL file for records that could not be exported")
+    args = parser.parse_args()
+
+    schema = load_schema(args.schema)
+    logger.info(f"Columnar schema:\n{derive_arrow_schema(schema)}")
+    stats = export_submissions(args.source, args.output, schema, partition_by=args.partition_by,
+                               batch_size=args.batch_size, compression=args.compression,
+                               overwrite=args.overwrite, rejects_file=args.rejects)
+    logger.info(f"Exported {stats['exported']} records from {args.source} to {args.output}, "
+                f"rejected {stats['rejected']}")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,231 @@
+"""
+Duplicate and Conflict Detection for Udyam submission dumps
+Bloom-filter pre-pass, then an exact pass over an on-disk hash index with external sort
+"""
+
+import argparse
+import hashlib
+import heapq
+import json
+import logging
+import math
+import shutil
+import tempfile
+from itertools import groupby
+from pathlib import Path
+from typing import Dict, List, Any, Iterable, Iterator, Optional, Tuple
+
+from bulk_loader import iter_records
+from field_rules import iter_fields, load_schema
+
+logger = logging.getLogger(__name__)
+
+# Fixed-length coded fields that identify a record's *attributes* rather than its owner
+NON_IDENTIFIER_FIELDS = {"otp", "pincode"}
+
+# Rows listed per duplicate group in the report; the count is always exact
+MAX_REPORTED_ROWS = 100
+
+
+def identifier_fields(schema: Dict[str, Any]) -> List[str]:
+    """Fields with a fixed-length pattern (Aadhaar, PAN, mobile) that should map to one enterprise"""
+    names = []
+    for field in iter_fields(schema):
+        validation = field.get('validation', {})
+        fixed = validation.get('minLength') and validation.get('minLength') == validation.get('maxLength')
+        if validation.get('pattern') and fixed and field['name'] not in NON_IDENTIFIER_FIELDS:
+            names.append(field['name'])
+    return names
+
+
+def normalize_identifier(value: Any) -> str:
+    """Uppercase with all whitespace removed, which also keeps tabs and newlines out of the TSV index"""
+    return "".join(str(value).split()).upper() if value is not None else ""
+
+
+class BloomFilter:
+    def __init__(self, expected_items: int, false_positive_rate: float = 0.01):
+        """Fixed-size bit array sized for `expected_items` at the given false positive rate"""
+        expected_items = max(1, expected_items)
+        self.size = max(8, int(-expected_items * math.log(false_positive_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / expected_items * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str) -> Iterator[int]:
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, item: str) -> bool:
+        """Add an item; returns True if it was (probably) already present"""
+        present = True
+        for pos in self._positions(item):
+            byte, bit = divmod(pos, 8)
+            if not self.bits[byte] & (1 << bit):
+                present = False
+                self.bits[byte] |= 1 << bit
+        return present
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[pos // 8] & (1 << (pos % 8)) for pos in self._positions(item))
+
+
+def _external_sort(lines: Iterable[str], work_dir: Path, max_lines: int) -> Iterator[str]:
+    """Sort newline-terminated lines using sorted runs on disk, holding at most `max_lines`"""
+    runs = []
+    chunk: List[str] = []
+
+    def spill():
+        chunk.sort()
+        run = work_dir / f"run-{len(runs):05d}"
+        with open(run, 'w', encoding='utf-8') as f:
+            f.writelines(chunk)
+        runs.append(run)
+        chunk.clear()
+
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) >= max_lines:
+            spill()
+
+    if not runs:
+        chunk.sort()
+        yield from chunk
+        return
+    if chunk:
+        spill()
+
+    handles = [open(run, 'r', encoding='utf-8') for run in runs]
+    try:
+        yield from heapq.merge(*handles)
+    finally:
+        for handle in handles:
+            handle.close()
+        for run in runs:
+            run.unlink()
+
+
+class DuplicateDetector:
+    def __init__(self, fields: List[str], expected_rows: int = 1_000_000,
+                 buckets: int = 64, max_sort_lines: int = 1_000_000,
+                 work_dir: Optional[str] = None):
+        """
+        Find records sharing an identifier value.
+
+        Memory is bounded by the Bloom filters (~1.2 bytes per expected value per field)
+        and by `max_sort_lines` lines while sorting a bucket.
+        """
+        self.fields = fields
+        self.expected_rows = expected_rows
+        self.buckets = buckets
+        self.max_sort_lines = max_sort_lines
+        self.work_dir = work_dir
+
+    def _candidates(self, source: str) -> Dict[str, BloomFilter]:
+        """Pass 1: values seen more than once (plus Bloom false positives) per field"""
+        seen = {f: BloomFilter(self.expected_rows) for f in self.fields}
+        repeated = {f: BloomFilter(self.expected_rows // 10 + 1) for f in self.fields}
+        for record in iter_records(source):
+            for f in self.fields:
+                value = normalize_identifier(record.get(f))
+                if value and seen[f].add(value):
+                    repeated[f].add(value)
+        return repeated
+
+    def _bucket_index(self, source: str, repeated: Dict[str, BloomFilter], index_dir: Path) -> List[Path]:
+        """Pass 2: hash-partition candidate (field, value, row, identifiers) lines into bucket files"""
+        paths = [index_dir / f"bucket-{i:04d}.tsv" for i in range(self.buckets)]
+        handles = [open(p, 'w', encoding='utf-8') for p in paths]
+        try:
+            for row, record in enumerate(iter_records(source), start=1):
+                values = [normalize_identifier(record.get(f)) for f in self.fields]
+                for f, value in zip(self.fields, values):
+                    if not value or value not in repeated[f]:
+                        continue
+                    digest = hashlib.blake2b(f"{f}\t{value}".encode(), digest_size=8).digest()
+                    bucket = int.from_bytes(digest, "little") % self.buckets
+                    handles[bucket].write("\t".join([f, value, f"{row:012d}", *values]) + "\n")
+        finally:
+            for handle in handles:
+                handle.close()
+        return paths
+
+    def detect(self, source: str) -> Iterator[Dict[str, Any]]:
+        """Yield one finding per identifier value that appears in more than one row"""
+        repeated = self._candidates(source)
+        index_dir = Path(tempfile.mkdtemp(prefix="dedupe-", dir=self.work_dir))
+        try:
+            for bucket in self._bucket_index(source, repeated, index_dir):
+                with open(bucket, 'r', encoding='utf-8') as f:
+                    lines = _external_sort(f, index_dir, self.max_sort_lines)
+                    for (field, value), group in groupby(lines, key=_group_key):
+                        finding = self._finding(field, value, group)
+                        if finding is not None:
+                            yield finding
+                bucket.unlink()
+        finally:
+            shutil.rmtree(index_dir, ignore_errors=True)
+
+    def _finding(self, field: str, value: str, group: Iterable[str]) -> Optional[Dict[str, Any]]:
+        rows = []
+        count = 0
+        others: Dict[str, set] = {f: set() for f in self.fields if f != field}
+        for line in group:
+            parts = line.rstrip("\n").split("\t")
+            count += 1
+            if len(rows) < MAX_REPORTED_ROWS:
+                rows.append(int(parts[2]))
+            for f, other in zip(self.fields, parts[3:]):
+                if f != field and other and len(others[f]) < MAX_REPORTED_ROWS:
+                    others[f].add(other)
+
+        # Single rows only got here as Bloom false positives
+        if count < 2:
+            return None
+
+        conflicts = {f: sorted(values) for f, values in others.items() if len(values) > 1}
+        return {
+            "type": "conflict" if conflicts else "duplicate",
+            "field": field,
+            "value": value,
+            "count": count,
+            "rows": rows,
+            "conflicts": conflicts
+        }
+
+
+def _group_key(line: str) -> Tuple[str, str]:
+    field, value, _ = line.split("\t", 2)
+    return field, value
+
+
+def main():
+    """Report duplicate and conflicting identifiers in a JSONL/CSV submission dump"""
+    parser = argparse.ArgumentParser(description="Detect duplicate and conflicting Udyam submissions")
+    parser.add_argument("source", help="JSONL or CSV file of submission records")
+    parser.add_argument("--schema", default="udyam_form_schema.json", help="Scraped schema file")
+    parser.add_argument("--fields", nargs="*", help="Identifier fields (default: derived from schema)")
+    parser.add_argument("--expected-rows", type=int, default=1_000_000)
+    parser.add_argument("--buckets", type=int, default=64)
+    parser.add_argument("--output", default="duplicates.jsonl")
+    parser.add_argument("--work-dir", default=None, help="Directory for temporary index files")
+    args = parser.parse_args()
+
+    fields = args.fields or identifier_fields(load_schema(args.schema))
+    detector = DuplicateDetector(fields, expected_rows=args.expected_rows,
+                                 buckets=args.buckets, work_dir=args.work_dir)
+
+    summary = {"duplicate": 0, "conflict": 0}
+    with open(args.output, 'w', encoding='utf-8') as out:
+        for finding in detector.detect(args.source):
+            summary[finding["type"]] += 1
+            out.write(json.dumps(finding) + "\n")
+
+    logger.info(f"Checked {', '.join(fields)}: {summary['duplicate']} duplicate values, "
+                f"{summary['conflict']} conflicting values -> {args.output}")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,78 @@
+"""
+Field Rules derived from the scraped Udyam schema
+Compiles per-field validation rules so submission records can be checked outside the browser
+"""
+
+import re
+from typing import Dict, List, Any, Iterator, Optional
+
+from option_index import load_options
+from schema_generator import SchemaGenerator
+
+EMAIL_PATTERN = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+
+def load_schema(schema_file: str = "udyam_form_schema.json") -> Dict[str, Any]:
+    """Load the scraped schema, falling back to the generator's default schema"""
+    return SchemaGenerator(schema_file).schema_data
+
+
+def iter_fields(schema: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Yield every named field across all steps"""
+    for step in schema.get('steps', []):
+        for field in step.get('fields', []):
+            if field.get('name'):
+                yield field
+
+
+class RecordValidator:
+    def __init__(self, schema: Dict[str, Any], fields: Optional[List[str]] = None):
+        """Compile rules for the schema's fields, optionally limited to `fields`"""
+        self.rules: Dict[str, Dict[str, Any]] = {}
+        for field in iter_fields(schema):
+            name = field['name']
+            if fields is not None and name not in fields:
+                continue
+
+            validation = field.get('validation', {})
+            pattern = validation.get('pattern') or field.get('pattern')
+            options = {o.get('value') for o in load_options(field) or [] if o.get('value')}
+            self.rules[name] = {
+                "required": bool(field.get('required') or validation.get('required')),
+                "pattern": re.compile(pattern) if pattern else None,
+                "minLength": validation.get('minLength'),
+                "maxLength": validation.get('maxLength'),
+                "email": bool(validation.get('email')) or field.get('type') == 'email',
+                "options": options or None,
+                # Dependent selects (e.g. district) only accept the values of the chosen parent
+                "dependsOn": field.get('dependsOn'),
+                "optionsByParent": {
+                    parent_value: set(values)
+                    for parent_value, values in (field.get('optionsByParent') or {}).items()
+                }
+            }
+
+    def validate(self, record: Dict[str, Any]) -> Dict[str, str]:
+        """Return field name -> error message; an empty dict means the record is valid"""
+        errors = {}
+        for name, rule in self.rules.items():
+            value = record.get(name)
+            if value is None or value == "":
+                if rule["required"]:
+                    errors[name] = "Required"
+                continue
+
+            value = str(value)
+            if rule["pattern"] is not None and not rule["pattern"].match(value):
+                errors[name] = "Invalid format"
+            elif rule["minLength"] and len(value) < rule["minLength"]:
+                errors[name] = f"Minimum {rule['minLength']} characters required"
+            elif rule["maxLength"] and len(value) > rule["maxLength"]:
+                errors[name] = f"Maximum {rule['maxLength']} characters allowed"
+            elif rule["email"] and not EMAIL_PATTERN.match(value):
+                errors[name] = "Invalid email address"
+            elif rule["options"] is not None and value not in rule["options"]:
+                errors[name] = "Not one of the allowed options"
+            elif rule["dependsOn"] and value not in rule["optionsByParent"].get(record.get(rule["dependsOn"]), {value}):
+                errors[name] = f"Not an option for the selected {rule['dependsOn']}"
+        return errors
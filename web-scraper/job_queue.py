@@ -0,0 +1,196 @@
+"""
+Durable Job Queue for distributed scraping
+Lease-based work queue with a pluggable backend; SQLite is the local default
+"""
+
+import json
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Any, Optional
+
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+
+class JobQueue(ABC):
+    """
+    Backend interface for scrape units.
+
+    A job is claimed under a lease; if the worker dies the lease expires and the job
+    becomes claimable again. Jobs are plain dicts with id, key, kind, payload and attempts.
+    """
+
+    @abstractmethod
+    def enqueue(self, kind: str, payload: Dict[str, Any], key: Optional[str] = None,
+                max_attempts: int = 3) -> bool:
+        """Add a job; returns False if a job with the same key already exists"""
+
+    @abstractmethod
+    def claim(self, worker_id: str, lease_seconds: float = 300) -> Optional[Dict[str, Any]]:
+        """Lease the next runnable job to `worker_id`, or return None if none is ready"""
+
+    @abstractmethod
+    def heartbeat(self, job_id: int, worker_id: str, lease_seconds: float = 300) -> bool:
+        """Extend a lease; returns False if the worker no longer holds it"""
+
+    @abstractmethod
+    def complete(self, job_id: int, worker_id: str, result: Any) -> bool:
+        """Store a job's result; returns False if the lease was lost"""
+
+    @abstractmethod
+    def fail(self, job_id: int, worker_id: str, error: str, retry_delay: float = 5.0) -> bool:
+        """Record a failure and requeue the job unless it is out of attempts"""
+
+    @abstractmethod
+    def results(self, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Completed jobs with their payload and result"""
+
+    @abstractmethod
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs in each status"""
+
+    def is_drained(self) -> bool:
+        """True once no job is pending or leased"""
+        counts = self.counts()
+        return counts.get(PENDING, 0) == 0 and counts.get(LEASED, 0) == 0
+
+
+class SQLiteJobQueue(JobQueue):
+    def __init__(self, path: str = "scrape_queue.db", timeout: float = 30.0):
+        """
+        Open (or create) a queue database.
+
+        Each process should open its own instance. WAL mode lets many local workers
+        claim concurrently; for workers on other nodes use a networked backend.
+        """
+        self.path = path
+        # Shared with the worker's heartbeat thread, which only runs while the main
+        # thread is busy scraping, so calls never interleave
+        self.conn = sqlite3.connect(path, timeout=timeout, isolation_level=None,
+                                    check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id            INTEGER PRIMARY KEY AUTOINCREMENT,
+                key           TEXT UNIQUE,
+                kind          TEXT NOT NULL,
+                payload       TEXT NOT NULL,
+                status        TEXT NOT NULL DEFAULT 'pending',
+                attempts      INTEGER NOT NULL DEFAULT 0,
+                max_attempts  INTEGER NOT NULL DEFAULT 3,
+                available_at  REAL NOT NULL DEFAULT 0,
+                lease_owner   TEXT,
+                lease_expires REAL,
+                result        TEXT,
+                error         TEXT,
+                updated_at    REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_jobs_runnable ON jobs (status, available_at);
+        """)
+
+    def enqueue(self, kind: str, payload: Dict[str, Any], key: Optional[str] = None,
+                max_attempts: int = 3) -> bool:
+        cursor = self.conn.execute(
+            "INSERT OR IGNORE INTO jobs (key, kind, payload, max_attempts, updated_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (key, kind, json.dumps(payload), max_attempts, time.time())
+        )
+        return cursor.rowcount == 1
+
+    def claim(self, worker_id: str, lease_seconds: float = 300) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        # IMMEDIATE takes the write lock up front so two workers cannot pick the same row
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Expired leases of jobs that already used every attempt are given up on
+            self.conn.execute(
+                "UPDATE jobs SET status = ?, error = COALESCE(error, 'lease expired'), updated_at = ? "
+                "WHERE status = ? AND lease_expires <= ? AND attempts >= max_attempts",
+                (FAILED, now, LEASED, now)
+            )
+            row = self.conn.execute(
+                "SELECT * FROM jobs WHERE (status = ? AND available_at <= ?) "
+                "OR (status = ? AND lease_expires <= ?) ORDER BY id LIMIT 1",
+                (PENDING, now, LEASED, now)
+            ).fetchone()
+            if row is None:
+                self.conn.execute("COMMIT")
+                return None
+
+            self.conn.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, lease_owner = ?, "
+                "lease_expires = ?, updated_at = ? WHERE id = ?",
+                (LEASED, worker_id, now + lease_seconds, now, row["id"])
+            )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+        return {
+            "id": row["id"],
+            "key": row["key"],
+            "kind": row["kind"],
+            "payload": json.loads(row["payload"]),
+            "attempts": row["attempts"] + 1
+        }
+
+    def heartbeat(self, job_id: int, worker_id: str, lease_seconds: float = 300) -> bool:
+        now = time.time()
+        cursor = self.conn.execute(
+            "UPDATE jobs SET lease_expires = ?, updated_at = ? "
+            "WHERE id = ? AND status = ? AND lease_owner = ?",
+            (now + lease_seconds, now, job_id, LEASED, worker_id)
+        )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: int, worker_id: str, result: Any) -> bool:
+        cursor = self.conn.execute(
+            "UPDATE jobs SET status = ?, result = ?, error = NULL, lease_owner = NULL, "
+            "lease_expires = NULL, updated_at = ? WHERE id = ? AND status = ? AND lease_owner = ?",
+            (DONE, json.dumps(result), time.time(), job_id, LEASED, worker_id)
+        )
+        return cursor.rowcount == 1
+
+    def fail(self, job_id: int, worker_id: str, error: str, retry_delay: float = 5.0) -> bool:
+        now = time.time()
+        cursor = self.conn.execute(
+            "UPDATE jobs SET "
+            "status = CASE WHEN attempts >= max_attempts THEN ? ELSE ? END, "
+            "available_at = ? + ? * (1 << (attempts - 1)), "
+            "error = ?, lease_owner = NULL, lease_expires = NULL, updated_at = ? "
+            "WHERE id = ? AND status = ? AND lease_owner = ?",
+            (FAILED, PENDING, now, retry_delay, error, now, job_id, LEASED, worker_id)
+        )
+        return cursor.rowcount == 1
+
+    def results(self, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        query = "SELECT id, key, kind, payload, result FROM jobs WHERE status = ?"
+        params: List[Any] = [DONE]
+        if kind is not None:
+            query += " AND kind = ?"
+            params.append(kind)
+
+        return [
+            {
+                "id": row["id"],
+                "key": row["key"],
+                "kind": row["kind"],
+                "payload": json.loads(row["payload"]),
+                "result": json.loads(row["result"])
+            }
+            for row in self.conn.execute(query + " ORDER BY id", params)
+        ]
+
+    def counts(self) -> Dict[str, int]:
+        rows = self.conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status")
+        return {row["status"]: row["n"] for row in rows}
+
+    def close(self):
+        """Close the database connection"""
+        self.conn.close()
@@ -0,0 +1,203 @@
+"""
+Autocomplete Index for large Udyam option lists
+Sorted word array with a word inverted index, serialized as a compact JSON artifact
+"""
+
+import json
+import re
+from bisect import bisect_left
+from typing import Dict, List, Any, Iterable, Iterator, Optional
+
+INDEX_VERSION = 2
+
+# Posting lists are delta-encoded varints written as text: each character carries five
+# bits of a value, and characters from the upper half of the alphabet mean "more follows"
+VARINT_ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_"
+_VARINT_DIGITS = {ch: i for i, ch in enumerate(VARINT_ALPHABET)}
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def normalize(text: str) -> str:
+    """Lowercase and collapse punctuation/whitespace so matching ignores formatting"""
+    return _NON_ALNUM.sub(" ", text.lower()).strip()
+
+
+def trigrams(text: str) -> List[str]:
+    """Distinct trigrams of an already-normalized string"""
+    return sorted({text[i:i + 3] for i in range(len(text) - 2)})
+
+
+def encode_posting(ids: List[int]) -> str:
+    """Encode ascending ids as a varint string of their deltas"""
+    chars = []
+    previous = 0
+    for i in ids:
+        value = i - previous
+        previous = i
+        while value >= 32:
+            chars.append(VARINT_ALPHABET[32 + (value & 31)])
+            value >>= 5
+        chars.append(VARINT_ALPHABET[value])
+    return "".join(chars)
+
+
+def iter_posting(encoded: str) -> Iterator[int]:
+    """Decode an `encode_posting` string lazily, so a search can stop after a few ids"""
+    total = value = shift = 0
+    for ch in encoded:
+        digit = _VARINT_DIGITS[ch]
+        value |= (digit & 31) << shift
+        if digit >= 32:
+            shift += 5
+            continue
+        total += value
+        yield total
+        value = shift = 0
+
+
+def decode_posting(encoded: str) -> List[int]:
+    """Inverse of `encode_posting`"""
+    return list(iter_posting(encoded))
+
+
+class OptionIndex:
+    def __init__(self, entries: List[List[str]], words: List[str], postings: List[str]):
+        """Use `OptionIndex.build` or `OptionIndex.load` rather than calling this directly"""
+        self.entries = entries
+        self.words = words
+        self.postings = postings
+        self._normalized = [normalize(text) for _, text in entries]
+        self._word_ids = {word: i for i, word in enumerate(words)}
+
+        # Trigrams of the vocabulary are cheap to derive, so they are built here rather
+        # than stored in the artifact
+        self._word_grams: Dict[str, List[int]] = {}
+        for i, word in enumerate(words):
+            for gram in trigrams(word):
+                self._word_grams.setdefault(gram, []).append(i)
+
+    @classmethod
+    def build(cls, options: Iterable[Dict[str, Any]]) -> "OptionIndex":
+        """Build an index from {"value", "text"} options, skipping blank placeholders"""
+        entries = []
+        seen = set()
+        for option in options:
+            value = option.get("value") or ""
+            text = option.get("text") or value
+            if not value or (value, text) in seen:
+                continue
+            seen.add((value, text))
+            entries.append([value, text])
+
+        # The sorted vocabulary is the prefix array; each word maps to the entries using it
+        by_word: Dict[str, List[int]] = {}
+        for i, (_, text) in enumerate(entries):
+            for word in set(normalize(text).split()):
+                by_word.setdefault(word, []).append(i)
+        words = sorted(by_word)
+
+        return cls(entries, words, [encode_posting(by_word[word]) for word in words])
+
+    def search(self, query: str, limit: int = 10) -> List[Dict[str, str]]:
+        """Return up to `limit` options, word-prefix matches first, then substring matches"""
+        q = normalize(query)
+        if not q:
+            return [{"value": v, "text": t} for v, t in self.entries[:limit]]
+
+        tokens = q.split(" ")
+        matches: List[int] = []
+        seen = set()
+
+        def take(candidates: Iterable[int], verify) -> bool:
+            for entry_id in candidates:
+                if len(matches) >= limit:
+                    return True
+                if entry_id not in seen and (verify is None or verify(self._normalized[entry_id])):
+                    seen.add(entry_id)
+                    matches.append(entry_id)
+            return len(matches) >= limit
+
+        at_word_start = lambda text: text.startswith(q) or f" {q}" in text
+        if len(tokens) == 1:
+            for word_id in self._words_with_prefix(q):
+                if take(iter_posting(self.postings[word_id]), None):
+                    break
+        else:
+            # Every token but the last must be a whole word, so the rarest of them bounds the candidates
+            take(self._rarest_exact(tokens[:-1]), at_word_start)
+
+        if len(matches) < limit and len(q) >= 3:
+            contains = lambda text: q in text
+            if len(tokens) > 2:
+                take(self._rarest_exact(tokens[1:-1]), contains)
+            else:
+                token = max(tokens, key=len)
+                for word_id in self._words_containing(token):
+                    if take(iter_posting(self.postings[word_id]), None if len(tokens) == 1 else contains):
+                        break
+
+        return [{"value": self.entries[i][0], "text": self.entries[i][1]} for i in matches]
+
+    def _words_with_prefix(self, prefix: str) -> Iterable[int]:
+        for word_id in range(bisect_left(self.words, prefix), len(self.words)):
+            if not self.words[word_id].startswith(prefix):
+                break
+            yield word_id
+
+    def _rarest_exact(self, tokens: List[str]) -> Iterable[int]:
+        rarest = None
+        for token in tokens:
+            word_id = self._word_ids.get(token)
+            if word_id is None:
+                return []
+            # Encoded length grows with the number of ids, so it ranks postings without decoding
+            if rarest is None or len(self.postings[word_id]) < len(rarest):
+                rarest = self.postings[word_id]
+        return iter_posting(rarest) if rarest is not None else []
+
+    def _words_containing(self, token: str) -> Iterable[int]:
+        if len(token) < 3:
+            return (i for i, word in enumerate(self.words) if token in word)
+        rarest = min((self._word_grams.get(gram, []) for gram in trigrams(token)), key=len)
+        return (i for i in rarest if token in self.words[i])
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serializable form; posting lists are aligned with `words`"""
+        return {
+            "version": INDEX_VERSION,
+            "entries": self.entries,
+            "words": self.words,
+            "postings": self.postings
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "OptionIndex":
+        """Rebuild an index from `to_dict` output"""
+        if data.get("version") != INDEX_VERSION:
+            raise ValueError(f"Unsupported option index version: {data.get('version')}")
+        return cls(data["entries"], data["words"], data["postings"])
+
+    def save(self, filename: str):
+        """Write the index artifact as compact JSON"""
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, filename: str) -> "OptionIndex":
+        """Load an index artifact written by `save`"""
+        with open(filename, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+def load_options(field: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+    """Options for a scraped field, whether inline or streamed to an options_file"""
+    if field.get("options") is not None:
+        return field["options"]
+    if field.get("options_file"):
+        with open(field["options_file"], 'r', encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+    return None
@@ -0,0 +1,405 @@
+"""
+Record and Replay for offline Udyam scraping
+A local reverse proxy that records portal traffic into a compressed archive, or serves it back
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import re
+import struct
+import threading
+import urllib.error
+import urllib.request
+import zipfile
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Any, Optional, Tuple
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+PORTAL_ORIGIN = "https://udyamregistration.gov.in"
+
+MANIFEST_NAME = "manifest.json"
+
+# Resources on other hosts are fetched through the proxy as /__external__/<scheme>/<host>/<path>
+EXTERNAL_PREFIX = "/__external__/"
+
+# Hop-by-hop, length and server-stamped headers are regenerated rather than copied,
+# which also keeps replayed responses identical from run to run
+_SKIPPED_HEADERS = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization", "te",
+    "trailers", "transfer-encoding", "upgrade", "content-length", "content-encoding", "host",
+    "date", "server"
+}
+
+_COOKIE_DOMAIN = re.compile(r";\s*domain=[^;]*", re.IGNORECASE)
+
+# Absolute URLs in attributes and CSS that make the browser load something
+_RESOURCE_URL = re.compile(
+    rb"""((?:\b(?:src|href|action|srcset|poster)\s*=\s*["']?)|url\(\s*["']?)(?:(https?):)?//([a-z0-9.-]+(?::[0-9]+)?)""",
+    re.IGNORECASE
+)
+_ABSOLUTE_URL = re.compile(r"^(?:(https?):)?//([^/?#]+)", re.IGNORECASE)
+
+_LOCAL_HEADER = struct.Struct("<4s2B4HL2L2H")
+_LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+
+
+def exchange_key(method: str, path: str, body: bytes) -> str:
+    """Identify a request by method, path+query and a digest of its body"""
+    return f"{method} {path} {hashlib.sha1(body).hexdigest()}"
+
+
+def _salvage_members(path: str) -> Dict[str, bytes]:
+    """
+    Read a zip whose central directory was never written (the recording was killed)
+    by walking its local file headers, stopping at the first incomplete member
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    members: Dict[str, bytes] = {}
+    offset = 0
+    while data[offset:offset + 4] == _LOCAL_HEADER_SIGNATURE and offset + _LOCAL_HEADER.size <= len(data):
+        (_, _, _, flags, method, _, _, crc, compressed_size, _,
+         name_length, extra_length) = _LOCAL_HEADER.unpack_from(data, offset)
+        name_start = offset + _LOCAL_HEADER.size
+        start = name_start + name_length + extra_length
+        end = start + compressed_size
+        if flags & 0x08 or end > len(data):
+            break
+        try:
+            raw = data[start:end]
+            content = zlib.decompress(raw, -zlib.MAX_WBITS) if method == zipfile.ZIP_DEFLATED else raw
+        except zlib.error:
+            break
+        if zlib.crc32(content) != crc:
+            break
+        members[data[name_start:name_start + name_length].decode("utf-8")] = content
+        offset = end
+    return members
+
+
+class ScrapeArchive:
+    def __init__(self, path: str, mode: str = "r"):
+        """Open a zip archive of recorded exchanges for reading ('r') or recording ('w')"""
+        self.path = path
+        self.mode = mode
+        self._file = None
+        self._zip: Optional[zipfile.ZipFile] = None
+        self._lock = threading.Lock()
+        self.exchanges: List[Dict[str, Any]] = []
+
+        if mode == "w":
+            # Own the file object so every exchange can be flushed to disk as it is recorded
+            self._file = open(path, "wb")
+            self._zip = zipfile.ZipFile(self._file, "w", compression=zipfile.ZIP_DEFLATED)
+        else:
+            try:
+                self._zip = zipfile.ZipFile(path, "r")
+                names = set(self._zip.namelist())
+                self._read = self._zip.read
+            except zipfile.BadZipFile:
+                members = _salvage_members(path)
+                logger.warning(f"{path} was not closed cleanly; recovered {len(members)} members")
+                names = set(members)
+                self._read = members.__getitem__
+            if MANIFEST_NAME in names:
+                self.exchanges = json.loads(self._read(MANIFEST_NAME))
+            else:
+                self.exchanges = self._exchanges_from_members(names)
+
+        self._by_key: Dict[str, List[int]] = {}
+        self._by_url: Dict[str, List[int]] = {}
+        self._served: Dict[str, int] = {}
+        for i, exchange in enumerate(self.exchanges):
+            self._index(i, exchange)
+
+    def _exchanges_from_members(self, names) -> List[Dict[str, Any]]:
+        """Rebuild the manifest from the per-exchange members written while recording"""
+        exchanges = []
+        for name in sorted(n for n in names if n.startswith("exchanges/")):
+            try:
+                exchange = json.loads(self._read(name))
+            except ValueError:
+                # The member being written when the recording stopped
+                break
+            if exchange["body"] not in names:
+                break
+            exchanges.append(exchange)
+        return exchanges
+
+    def _index(self, i: int, exchange: Dict[str, Any]):
+        self._by_key.setdefault(exchange["key"], []).append(i)
+        self._by_url.setdefault(f"{exchange['method']} {exchange['path']}", []).append(i)
+
+    def record(self, method: str, path: str, request_body: bytes, status: int,
+               headers: List[Tuple[str, str]], body: bytes):
+        """
+        Append one exchange.
+
+        The body and the exchange's manifest entry are stored as separate compressed
+        members and flushed immediately, so a recording that is killed can still be read.
+        """
+        with self._lock:
+            i = len(self.exchanges)
+            member = f"responses/{i:06d}"
+            self._zip.writestr(member, body)
+            exchange = {
+                "key": exchange_key(method, path, request_body),
+                "method": method,
+                "path": path,
+                "status": status,
+                "headers": headers,
+                "body": member
+            }
+            self._zip.writestr(f"exchanges/{i:06d}.json", json.dumps(exchange))
+            self._file.flush()
+            self.exchanges.append(exchange)
+            self._index(i, exchange)
+
+    def lookup(self, method: str, path: str, request_body: bytes) -> Optional[Tuple[Dict[str, Any], bytes]]:
+        """
+        Find the recorded response for a request.
+
+        Exact matches are replayed in recording order; if the body differs (e.g. a
+        timestamp in a postback) the responses recorded for the same URL are used.
+        """
+        with self._lock:
+            key = exchange_key(method, path, request_body)
+            candidates = self._by_key.get(key)
+            if not candidates:
+                # Bodies that never match exactly would each start at the first response,
+                # so the fallback advances one counter per URL
+                key = f"{method} {path}"
+                candidates = self._by_url.get(key)
+            if not candidates:
+                return None
+            served = self._served.get(key, 0)
+            self._served[key] = served + 1
+            exchange = self.exchanges[candidates[min(served, len(candidates) - 1)]]
+            return exchange, self._read(exchange["body"])
+
+    def close(self):
+        """Write the manifest (when recording) and close the archive"""
+        with self._lock:
+            if self.mode == "w":
+                self._zip.writestr(MANIFEST_NAME, json.dumps(self.exchanges))
+            if self._zip is not None:
+                self._zip.close()
+            if self._file is not None:
+                self._file.close()
+
+
+class ArchiveServer:
+    def __init__(self, archive: ScrapeArchive, upstream: Optional[str] = None,
+                 host: str = "127.0.0.1", port: int = 0):
+        """
+        Serve `archive` over HTTP.
+
+        With `upstream` set the server is a recording reverse proxy to that origin;
+        without it every request is answered from the archive. Recorded pages are
+        rewritten so that every link back to the upstream, and every resource loaded
+        from another host, goes through the server as well.
+        """
+        self.archive = archive
+        self.upstream = upstream.rstrip("/") if upstream else None
+        self._upstream_url = _origin_pattern(self.upstream) if upstream else None
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def origin(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url_for(self, portal_url: str) -> str:
+        """Rewrite a portal URL to go through this server"""
+        parts = urlsplit(portal_url)
+        return self.origin + (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+
+    def start(self) -> "ArchiveServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        logger.info(f"{'Recording' if self.upstream else 'Replaying'} on {self.origin}")
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self._handle()
+
+            def do_POST(self):
+                self._handle()
+
+            def do_HEAD(self):
+                self._handle()
+
+            def _handle(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                if server.upstream:
+                    status, headers, payload = server._forward(self, body)
+                    server.archive.record(self.command, self.path, body, status, headers, payload)
+                else:
+                    found = server.archive.lookup(self.command, self.path, body)
+                    if found is None:
+                        logger.warning(f"Not in archive: {self.command} {self.path}")
+                        status, headers, payload = 404, [], b""
+                    else:
+                        exchange, payload = found
+                        status, headers = exchange["status"], exchange["headers"]
+                self._respond(status, headers, payload)
+
+            def _respond(self, status: int, headers: List[Tuple[str, str]], payload: bytes):
+                self.send_response(status)
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        return Handler
+
+    def _target(self, path: str) -> Optional[str]:
+        """Upstream URL for a path requested from this server"""
+        if not path.startswith(EXTERNAL_PREFIX):
+            return self.upstream + path
+        scheme, _, rest = path[len(EXTERNAL_PREFIX):].partition("/")
+        host, _, rest = rest.partition("/")
+        if scheme not in ("http", "https") or not host:
+            return None
+        return f"{scheme}://{host}/{rest}"
+
+    def _rewrite_location(self, value: str) -> str:
+        """Make a redirect target relative to this server"""
+        value = self._upstream_url.sub(lambda m: _relative(m, value.encode()), value.encode()).decode()
+        match = _ABSOLUTE_URL.match(value)
+        if match:
+            value = f"{EXTERNAL_PREFIX}{(match.group(1) or 'https').lower()}/{match.group(2)}{value[match.end():]}"
+        return value or "/"
+
+    def _rewrite_body(self, payload: bytes) -> bytes:
+        """Point absolute portal links, in any spelling, and other hosts' resources at this server"""
+        payload = self._upstream_url.sub(lambda m: _relative(m, payload), payload)
+        return _RESOURCE_URL.sub(
+            lambda m: m.group(1) + EXTERNAL_PREFIX.encode() + (m.group(2) or b"https").lower() + b"/" + m.group(3),
+            payload
+        )
+
+    def _forward(self, handler: BaseHTTPRequestHandler, body: bytes) -> Tuple[int, List[Tuple[str, str]], bytes]:
+        target = self._target(handler.path)
+        if target is None:
+            return 404, [], b""
+        headers = {
+            name: value for name, value in handler.headers.items()
+            if name.lower() not in _SKIPPED_HEADERS and name.lower() != "accept-encoding"
+        }
+        request = urllib.request.Request(target, data=body or None, headers=headers, method=handler.command)
+        opener = urllib.request.build_opener(_NoRedirect)
+        try:
+            response = opener.open(request, timeout=60)
+        except urllib.error.HTTPError as e:
+            response = e
+
+        with response:
+            payload = response.read()
+            status = response.status if hasattr(response, "status") else response.code
+            out_headers = []
+            for name, value in response.headers.items():
+                lower = name.lower()
+                if lower in _SKIPPED_HEADERS:
+                    continue
+                if lower == "location":
+                    # Stored relative so replays work on whatever port they are served from
+                    value = self._rewrite_location(value)
+                elif lower == "set-cookie":
+                    value = _COOKIE_DOMAIN.sub("", value)
+                out_headers.append((name, value))
+
+            # Absolute links would bypass the proxy, so make them relative
+            content_type = response.headers.get("Content-Type", "")
+            if any(kind in content_type for kind in ("text/", "javascript", "json")):
+                payload = self._rewrite_body(payload)
+        return status, out_headers, payload
+
+
+def _origin_pattern(origin: str) -> "re.Pattern[bytes]":
+    """
+    Match absolute URLs for `origin` in every spelling a page may use: either scheme,
+    protocol-relative, and with or without the default port
+    """
+    parts = urlsplit(origin)
+    port = f":{parts.port}" if parts.port else "(?::(?:443|80))?"
+    return re.compile(
+        rf"(?:https?:)?//{re.escape(parts.hostname)}{port}(?![\w.:-])".encode(), re.IGNORECASE
+    )
+
+
+def _relative(match: "re.Match[bytes]", text: bytes) -> bytes:
+    """Replacement for a matched origin: nothing before a path, the site root otherwise"""
+    return b"" if text[match.end():match.end() + 1] == b"/" else b"/"
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Pass redirects through to the browser so each hop is recorded"""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+def main():
+    """Record a live scrape into an archive, or replay one offline"""
+    parser = argparse.ArgumentParser(description="Record or replay Udyam portal scrapes")
+    parser.add_argument("mode", choices=["record", "replay", "serve"])
+    parser.add_argument("--archive", default="udyam_scrape.zip")
+    parser.add_argument("--output", default="udyam_form_schema.json")
+    parser.add_argument("--port", type=int, default=0)
+    args = parser.parse_args()
+
+    recording = args.mode == "record"
+    archive = ScrapeArchive(args.archive, "w" if recording else "r")
+    server = ArchiveServer(archive, upstream=PORTAL_ORIGIN if recording else None, port=args.port)
+    server.start()
+
+    try:
+        if args.mode == "serve":
+            logger.info("Press Ctrl+C to stop")
+            threading.Event().wait()
+
+        from scraper import UdyamScraper
+        from throttle import PortalRequestController
+
+        # Replays hit a local server, so there is nothing to be polite to; any host name
+        # the rewriting missed fails to resolve instead of reaching the live network
+        controller = None if recording else PortalRequestController(rate_per_host=1000, max_concurrency=64)
+        chrome_arguments = [] if recording else ["--host-resolver-rules=MAP * ~NOTFOUND"]
+        scraper = UdyamScraper(base_url=server.url_for(f"{PORTAL_ORIGIN}/UdyamRegistration.aspx"),
+                               controller=controller, chrome_arguments=chrome_arguments)
+        try:
+            scraper.scrape_form_fields()
+            scraper.save_schema(args.output)
+        finally:
+            scraper.close()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        archive.close()
+        logger.info(f"{len(archive.exchanges)} exchanges in {args.archive}")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -3,10 +3,31 @@ Schema Generator for Udyam Registration Form
 Generates TypeScript interfaces and validation schemas from scraped data
 """
 
+import io
 import json
 import re
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Iterable, TextIO
 from pathlib import Path
+from option_index import VARINT_ALPHABET, OptionIndex, load_options
+
+# Select fields with at least this many options get a prebuilt autocomplete index
+OPTION_INDEX_MIN_OPTIONS = 200
+
+# Buffer size for generated files and for batching small encoder chunks before writing
+WRITE_BUFFER_SIZE = 1 << 20
+
+
+def _write_chunks(out: TextIO, chunks: Iterable[str], batch_size: int = 4096):
+    """Write many small string chunks in batches to keep per-call overhead low"""
+    batch = []
+    for chunk in chunks:
+        batch.append(chunk)
+        if len(batch) >= batch_size:
+            out.write(''.join(batch))
+            batch.clear()
+    if batch:
+        out.write(''.join(batch))
+
 
 class SchemaGenerator:
     def __init__(self, schema_file: str = "udyam_form_schema.json"):
@@ -131,10 +152,14 @@ class SchemaGenerator:
     
     def generate_typescript_interfaces(self) -> str:
         """Generate TypeScript interfaces from the schema"""
-        interfaces = []
-        
+        out = io.StringIO()
+        self.write_typescript_interfaces(out)
+        return out.getvalue()
+    
+    def write_typescript_interfaces(self, out: TextIO):
+        """Stream TypeScript interfaces for the schema to a text file handle"""
         # Generate field option interface
-        interfaces.append("""
+        out.write("""
 export interface FieldOption {
   value: string;
   text: string;
@@ -142,7 +167,8 @@ export interface FieldOption {
 """)
         
         # Generate validation rules interface
-        interfaces.append("""
+        out.write("""
+
 export interface ValidationRules {
   required?: boolean;
   pattern?: string;
@@ -154,7 +180,8 @@ export interface ValidationRules {
 """)
         
         # Generate field interface
-        interfaces.append("""
+        out.write("""
+
 export interface FormField {
   name: string;
   type: string;
@@ -163,6 +190,11 @@ export interface FormField {
   required: boolean;
   validation?: ValidationRules;
   options?: FieldOption[];
+  options_file?: string;
+  option_count?: number;
+  optionIndex?: string;
+  dependsOn?: string;
+  optionsByParent?: Record<string, string[]>;
   value?: string;
   maxlength?: string;
   id?: string;
@@ -170,7 +202,8 @@ export interface FormField {
 """)
         
         # Generate step interface
-        interfaces.append("""
+        out.write("""
+
 export interface FormStep {
   step: number;
   title: string;
@@ -179,7 +212,8 @@ export interface FormStep {
 """)
         
         # Generate main schema interface
-        interfaces.append("""
+        out.write("""
+
 export interface UdyamFormSchema {
   steps: FormStep[];
   validation_rules?: Record<string, any>;
@@ -191,44 +225,34 @@ export interface UdyamFormSchema {
 """)
         
         # Generate form data interfaces for each step
+        step_types = []
         for step in self.schema_data.get('steps', []):
             step_num = step.get('step', 1)
             interface_name = f"Step{step_num}FormData"
+            step_types.append(interface_name)
             
-            fields_def = []
+            out.write(f"\n\nexport interface {interface_name} {{\n")
+            separator = ""
             for field in step.get('fields', []):
                 field_name = field.get('name', '')
-                field_type = self._get_typescript_type(field)
-                is_required = field.get('required', False)
+                if not field_name:
+                    continue
                 
-                if field_name:
-                    if is_required:
-                        fields_def.append(f"  {field_name}: {field_type};")
-                    else:
-                        fields_def.append(f"  {field_name}?: {field_type};")
-            
-            interface = f"""
-export interface {interface_name} {{
-{chr(10).join(fields_def)}
-}}
-"""
-            interfaces.append(interface)
+                field_type = self._get_typescript_type(field)
+                optional = "" if field.get('required', False) else "?"
+                out.write(f"{separator}  {field_name}{optional}: {field_type};")
+                separator = "\n"
+            out.write("\n}\n")
         
         # Generate combined form data interface
-        step_types = []
-        for step in self.schema_data.get('steps', []):
-            step_num = step.get('step', 1)
-            step_types.append(f"Step{step_num}FormData")
-        
         if step_types:
-            interfaces.append(f"""
+            out.write(f"""
+
 export interface UdyamFormData extends {', '.join(step_types)} {{
   currentStep: number;
   isComplete: boolean;
 }}
 """)
-        
-        return '\n'.join(interfaces)
     
     def _get_typescript_type(self, field: Dict[str, Any]) -> str:
         """Convert field type to TypeScript type"""
@@ -251,52 +275,55 @@ export interface UdyamFormData extends {', '.join(step_types)} {{
     
     def generate_zod_schema(self) -> str:
         """Generate Zod validation schema"""
-        imports = "import { z } from 'zod';\n\n"
+        out = io.StringIO()
+        self.write_zod_schema(out)
+        return out.getvalue()
+    
+    def write_zod_schema(self, out: TextIO):
+        """Stream the Zod validation schema to a text file handle"""
+        out.write("import { z } from 'zod';\n\n")
         
-        schemas = []
+        separator = ""
+        step_schemas = []
         
         # Generate validation schema for each step
         for step in self.schema_data.get('steps', []):
             step_num = step.get('step', 1)
             schema_name = f"step{step_num}Schema"
+            step_schemas.append(schema_name)
             
-            field_validations = []
+            started = False
             for field in step.get('fields', []):
                 field_name = field.get('name', '')
                 if not field_name:
                     continue
                 
                 validation = self._generate_zod_field_validation(field)
-                if validation:
-                    field_validations.append(f"  {field_name}: {validation}")
+                if not validation:
+                    continue
+                
+                if started:
+                    out.write(",\n")
+                else:
+                    out.write(f"{separator}export const {schema_name} = z.object({{\n")
+                    started = True
+                out.write(f"  {field_name}: {validation}")
             
-            if field_validations:
-                field_str = ',\n'.join(field_validations)
-                schema = f"""export const {schema_name} = z.object({{
-{field_str}
-}});
-"""
-                schemas.append(schema)
+            if started:
+                out.write("\n});\n")
+                separator = "\n"
         
         # Generate combined schema
-        step_schemas = []
-        for step in self.schema_data.get('steps', []):
-            step_num = step.get('step', 1)
-            step_schemas.append(f"step{step_num}Schema")
-        
         if step_schemas:
             and_clause = '.and('.join(step_schemas)
-            combined_schema = f"""
+            out.write(f"""{separator}
 export const udyamFormSchema = z.object({{
-  currentStep: z.number().min(1).max({len(self.schema_data.get('steps', []))}),
+  currentStep: z.number().min(1).max({len(step_schemas)}),
   isComplete: z.boolean().optional().default(false)
 }}).and({and_clause});
 
 export type UdyamFormData = z.infer<typeof udyamFormSchema>;
-"""
-            schemas.append(combined_schema)
-        
-        return imports + '\n'.join(schemas)
+""")
     
     def _generate_zod_field_validation(self, field: Dict[str, Any]) -> str:
         """Generate Zod validation for a single field"""
@@ -340,11 +367,19 @@ export type UdyamFormData = z.infer<typeof udyamFormSchema>;
     
     def generate_form_config(self) -> str:
         """Generate a TypeScript configuration file"""
-        config = f"""
+        out = io.StringIO()
+        self.write_form_config(out)
+        return out.getvalue()
+    
+    def write_form_config(self, out: TextIO):
+        """Stream the TypeScript configuration file, encoding the schema incrementally"""
+        out.write("""
 // Auto-generated form configuration
-export const UDYAM_FORM_CONFIG = {json.dumps(self.schema_data, indent=2)} as const;
+export const UDYAM_FORM_CONFIG = """)
+        _write_chunks(out, json.JSONEncoder(indent=2).iterencode(self._config_schema()))
+        out.write(""" as const;
 
-export const VALIDATION_MESSAGES = {{
+export const VALIDATION_MESSAGES = {
   required: 'This field is required',
   invalidAadhaar: 'Please enter a valid 12-digit Aadhaar number',
   invalidPAN: 'Please enter a valid PAN number (e.g., ABCDE1234F)',
@@ -352,39 +387,248 @@ export const VALIDATION_MESSAGES = {{
   invalidOTP: 'Please enter a valid 6-digit OTP',
   invalidPincode: 'Please enter a valid 6-digit PIN code',
   invalidEmail: 'Please enter a valid email address',
-  minLength: (min: number) => `Minimum ${{min}} characters required`,
-  maxLength: (max: number) => `Maximum ${{max}} characters allowed`
-}} as const;
-
-export const REGEX_PATTERNS = {{
-  aadhaar: /^[0-9]{{12}}$/,
-  pan: /^[A-Z]{{5}}[0-9]{{4}}[A-Z]{{1}}$/,
-  mobile: /^[6-9][0-9]{{9}}$/,
-  otp: /^[0-9]{{6}}$/,
-  pincode: /^[0-9]{{6}}$/
-}} as const;
+  minLength: (min: number) => `Minimum ${min} characters required`,
+  maxLength: (max: number) => `Maximum ${max} characters allowed`
+} as const;
+
+export const REGEX_PATTERNS = {
+  aadhaar: /^[0-9]{12}$/,
+  pan: /^[A-Z]{5}[0-9]{4}[A-Z]{1}$/,
+  mobile: /^[6-9][0-9]{9}$/,
+  otp: /^[0-9]{6}$/,
+  pincode: /^[0-9]{6}$/
+} as const;
+""")
+    
+    def _is_indexed(self, field: Dict[str, Any], min_options: int = OPTION_INDEX_MIN_OPTIONS) -> bool:
+        """Whether a field's options are large enough to be served from an index"""
+        if not field.get('name'):
+            return False
+        count = len(field['options']) if field.get('options') is not None else field.get('option_count', 0)
+        return count >= min_options
+    
+    def _config_schema(self) -> Dict[str, Any]:
+        """Schema for UDYAM_FORM_CONFIG, with indexed fields also pointing at their option index"""
+        steps = []
+        for step in self.schema_data.get('steps', []):
+            fields = []
+            for field in step.get('fields', []):
+                if self._is_indexed(field):
+                    # FormField still renders a plain <select>, so the options stay inline;
+                    # streamed lists are read back because their file is local to the scraper
+                    field = {**field, 'options': load_options(field) or [], 'optionIndex': field['name']}
+                    field.pop('options_file', None)
+                fields.append(field)
+            steps.append({**step, 'fields': fields})
+        return {**self.schema_data, 'steps': steps}
+    
+    def build_option_indexes(self, output_dir: str, min_options: int = OPTION_INDEX_MIN_OPTIONS) -> Dict[str, str]:
+        """Build and save autocomplete indexes for large option lists; returns field name -> file"""
+        output_path = Path(output_dir)
+        saved = {}
+        
+        for step in self.schema_data.get('steps', []):
+            for field in step.get('fields', []):
+                if not self._is_indexed(field, min_options):
+                    continue
+                
+                field_name = field['name']
+                options = load_options(field)
+                output_path.mkdir(parents=True, exist_ok=True)
+                index_file = output_path / f"{field_name}.index.json"
+                OptionIndex.build(options).save(str(index_file))
+                saved[field_name] = index_file.name
+        
+        return saved
+    
+    def generate_option_index_loader(self, index_files: Dict[str, str]) -> str:
+        """Generate a TypeScript loader/query module for the prebuilt option indexes"""
+        loaders = ',\n'.join(
+            f"  {json.dumps(name)}: () => import('./option-indexes/{filename}')"
+            for name, filename in sorted(index_files.items())
+        )
+        
+        return f"""
+// Auto-generated autocomplete index loader
+import type {{ FieldOption }} from './form-types';
+
+// JSON modules infer arrays of arrays as string[][], so entries are not declared as tuples
+interface OptionIndexData {{
+  version: number;
+  entries: string[][];
+  words: string[];
+  postings: string[];
+}}
+
+export interface OptionIndex {{
+  entries: string[][];
+  normalized: string[];
+  words: string[];
+  postings: string[];
+  wordIds: Map<string, number>;
+  wordGrams: Map<string, number[]>;
+}}
+
+export const OPTION_INDEX_LOADERS: Record<string, () => Promise<{{ default: OptionIndexData }}>> = {{
+{loaders}
+}};
+
+const cache = new Map<string, Promise<OptionIndex>>();
+
+const VARINT_ALPHABET = '{VARINT_ALPHABET}';
+const VARINT_DIGITS: Record<string, number> = {{}};
+for (let i = 0; i < VARINT_ALPHABET.length; i++) VARINT_DIGITS[VARINT_ALPHABET[i]] = i;
+
+export const normalizeOption = (text: string): string =>
+  text.toLowerCase().replace(/[^0-9a-z]+/g, ' ').trim();
+
+const trigramsOf = (text: string): string[] => {{
+  const grams: string[] = [];
+  for (let i = 0; i + 3 <= text.length; i++) {{
+    const gram = text.slice(i, i + 3);
+    if (grams.indexOf(gram) < 0) grams.push(gram);
+  }}
+  return grams;
+}};
+
+// Calls `visit` with each id of a varint posting until it returns true
+const forEachPosting = (encoded: string, visit: (id: number) => boolean): boolean => {{
+  let total = 0;
+  let value = 0;
+  let shift = 0;
+  for (let i = 0; i < encoded.length; i++) {{
+    const digit = VARINT_DIGITS[encoded[i]];
+    value += (digit & 31) * Math.pow(2, shift);
+    if (digit >= 32) {{
+      shift += 5;
+      continue;
+    }}
+    total += value;
+    value = 0;
+    shift = 0;
+    if (visit(total)) return true;
+  }}
+  return false;
+}};
+
+export function buildOptionIndex(data: OptionIndexData): OptionIndex {{
+  const wordIds = new Map<string, number>();
+  const wordGrams = new Map<string, number[]>();
+  data.words.forEach((word, i) => {{
+    wordIds.set(word, i);
+    for (const gram of trigramsOf(word)) {{
+      const ids = wordGrams.get(gram);
+      if (ids) ids.push(i);
+      else wordGrams.set(gram, [i]);
+    }}
+  }});
+  const normalized = data.entries.map((entry) => normalizeOption(entry[1]));
+  return {{ entries: data.entries, normalized, words: data.words, postings: data.postings, wordIds, wordGrams }};
+}}
+
+export function loadOptionIndex(field: string): Promise<OptionIndex> | undefined {{
+  const loader = OPTION_INDEX_LOADERS[field];
+  if (!loader) return undefined;
+  if (!cache.has(field)) cache.set(field, loader().then((m) => buildOptionIndex(m.default)));
+  return cache.get(field);
+}}
+
+export function searchOptions(index: OptionIndex, query: string, limit = 10): FieldOption[] {{
+  const q = normalizeOption(query);
+  const toOption = (i: number): FieldOption => ({{ value: index.entries[i][0], text: index.entries[i][1] }});
+  if (!q) return index.entries.slice(0, limit).map((_, i) => toOption(i));
+
+  const tokens = q.split(' ');
+  const matches: number[] = [];
+  const seen = new Set<number>();
+  const take = (encoded: string, verify?: (text: string) => boolean): boolean =>
+    forEachPosting(encoded, (id) => {{
+      if (matches.length >= limit) return true;
+      if (!seen.has(id) && (!verify || verify(index.normalized[id]))) {{
+        seen.add(id);
+        matches.push(id);
+      }}
+      return matches.length >= limit;
+    }});
+
+  // Every listed token must be a whole word, so the rarest (shortest encoded) posting bounds the candidates
+  const rarestExact = (words: string[]): string | undefined => {{
+    let rarest: string | undefined;
+    for (const word of words) {{
+      const id = index.wordIds.get(word);
+      if (id === undefined) return '';
+      if (rarest === undefined || index.postings[id].length < rarest.length) rarest = index.postings[id];
+    }}
+    return rarest;
+  }};
+
+  if (tokens.length === 1) {{
+    let lo = 0;
+    let hi = index.words.length;
+    while (lo < hi) {{
+      const mid = (lo + hi) >> 1;
+      if (index.words[mid] < q) lo = mid + 1;
+      else hi = mid;
+    }}
+    for (let w = lo; w < index.words.length && index.words[w].indexOf(q) === 0; w++) {{
+      if (take(index.postings[w])) break;
+    }}
+  }} else {{
+    take(rarestExact(tokens.slice(0, -1)) ?? '', (text) => text.indexOf(q) === 0 || text.indexOf(' ' + q) >= 0);
+  }}
+
+  if (matches.length < limit && q.length >= 3) {{
+    const contains = (text: string) => text.indexOf(q) >= 0;
+    if (tokens.length > 2) {{
+      take(rarestExact(tokens.slice(1, -1)) ?? '', contains);
+    }} else {{
+      const token = tokens.reduce((a, b) => (b.length > a.length ? b : a));
+      let candidates: number[];
+      if (token.length < 3) {{
+        candidates = index.words.map((_, i) => i);
+      }} else {{
+        candidates = [];
+        let rarestLength = Infinity;
+        for (const gram of trigramsOf(token)) {{
+          const ids = index.wordGrams.get(gram) ?? [];
+          if (ids.length < rarestLength) {{
+            candidates = ids;
+            rarestLength = ids.length;
+          }}
+        }}
+      }}
+      for (const w of candidates) {{
+        if (index.words[w].indexOf(token) >= 0 && take(index.postings[w], tokens.length === 1 ? undefined : contains)) break;
+      }}
+    }}
+  }}
+
+  return matches.map(toOption);
+}}
 """
-        return config
     
     def save_generated_files(self, output_dir: str = "../frontend/src/types"):
         """Save all generated TypeScript files"""
         output_path = Path(output_dir)
         output_path.mkdir(parents=True, exist_ok=True)
         
-        # Save TypeScript interfaces
-        interfaces_content = self.generate_typescript_interfaces()
-        with open(output_path / "form-types.ts", 'w', encoding='utf-8') as f:
-            f.write(interfaces_content)
-        
-        # Save Zod schemas
-        zod_content = self.generate_zod_schema()
-        with open(output_path / "form-validation.ts", 'w', encoding='utf-8') as f:
-            f.write(zod_content)
+        # Stream each file straight to disk so no full copy of the output is held in memory
+        emitters = [
+            ("form-types.ts", self.write_typescript_interfaces),
+            ("form-validation.ts", self.write_zod_schema),
+            ("form-config.ts", self.write_form_config)
+        ]
+        for filename, emit in emitters:
+            with open(output_path / filename, 'w', encoding='utf-8', buffering=WRITE_BUFFER_SIZE) as f:
+                emit(f)
         
-        # Save form configuration
-        config_content = self.generate_form_config()
-        with open(output_path / "form-config.ts", 'w', encoding='utf-8') as f:
-            f.write(config_content)
+        # Save autocomplete indexes for large option lists
+        index_files = self.build_option_indexes(str(output_path / "option-indexes"))
+        if index_files:
+            loader_content = self.generate_option_index_loader(index_files)
+            with open(output_path / "option-index.ts", 'w', encoding='utf-8') as f:
+                f.write(loader_content)
+            print(f"Built autocomplete indexes for: {', '.join(sorted(index_files))}")
         
         print(f"Generated TypeScript files saved to {output_path}")
 
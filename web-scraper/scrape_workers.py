@@ -0,0 +1,282 @@
+"""
+Distributed Scrape Workers for the Udyam Registration portal
+A coordinator enqueues scrape units into a durable queue; any number of workers claim and run them
+"""
+
+import argparse
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from typing import Dict, List, Any, Callable, Optional
+
+from job_queue import FAILED, JobQueue, SQLiteJobQueue
+from option_index import load_options
+from scraper import UdyamScraper
+from throttle import PortalRequestController
+
+logger = logging.getLogger(__name__)
+
+FORM_UNIT = "form"
+OPTIONS_UNIT = "options"
+
+# Child select -> parent select whose value drives the child's option list
+DEPENDENT_FIELDS = {
+    "district": "state"
+}
+
+# Combined request budget against the portal for all workers together
+PORTAL_RATE_PER_HOST = 2.0
+PORTAL_MAX_CONCURRENCY = 16
+
+
+def worker_controller(workers: int = 1) -> PortalRequestController:
+    """
+    Request controller for one of `workers` worker processes.
+
+    Every worker throttles on its own, so the portal budget is split evenly between
+    them; the combined rate and concurrency stay those of a single scraper.
+    """
+    workers = max(1, workers)
+    max_concurrency = max(1, PORTAL_MAX_CONCURRENCY // workers)
+    return PortalRequestController(
+        rate_per_host=PORTAL_RATE_PER_HOST / workers,
+        initial_concurrency=min(2, max_concurrency),
+        max_concurrency=max_concurrency
+    )
+
+
+class ScrapeCoordinator:
+    def __init__(self, queue: JobQueue, base_url: Optional[str] = None):
+        """Seed scrape units and merge worker results into one schema"""
+        self.queue = queue
+        self.base_url = base_url or "https://udyamregistration.gov.in/UdyamRegistration.aspx"
+
+    def seed(self):
+        """Enqueue the form unit; dependent option units follow once it completes"""
+        self.queue.enqueue(FORM_UNIT, {"url": self.base_url}, key=f"{FORM_UNIT}:{self.base_url}")
+
+    def expand(self) -> int:
+        """Enqueue one options unit per parent value found in completed form units"""
+        added = 0
+        for job in self.queue.results(FORM_UNIT):
+            fields = {
+                field.get("name"): field
+                for step in job["result"].get("steps", [])
+                for field in step.get("fields", [])
+            }
+            for child, parent in DEPENDENT_FIELDS.items():
+                if child not in fields or parent not in fields:
+                    continue
+                for option in load_options(fields[parent]) or []:
+                    value = option.get("value")
+                    if not value:
+                        continue
+                    payload = {
+                        "url": job["payload"]["url"],
+                        "parent": parent,
+                        "parent_value": value,
+                        "field": child
+                    }
+                    if self.queue.enqueue(OPTIONS_UNIT, payload, key=f"{OPTIONS_UNIT}:{child}:{value}"):
+                        added += 1
+        return added
+
+    def run(self, poll_interval: float = 2.0) -> Dict[str, Any]:
+        """
+        Seed, keep expanding until the queue drains, then return the merged schema.
+
+        Raises RuntimeError if any unit ran out of attempts, since the merged schema
+        would silently miss its fields or options.
+        """
+        self.seed()
+        while True:
+            self.expand()
+            if self.queue.is_drained() and self.expand() == 0:
+                break
+            logger.info(f"Queue status: {self.queue.counts()}")
+            time.sleep(poll_interval)
+
+        failed = self.queue.counts().get(FAILED, 0)
+        if failed:
+            raise RuntimeError(f"{failed} scrape units failed; not merging an incomplete schema")
+        return self.merge()
+
+    def merge(self) -> Dict[str, Any]:
+        """Combine completed units into the schema layout produced by UdyamScraper"""
+        schema = {
+            "steps": [],
+            "validation_rules": {},
+            "field_types": {},
+            "labels": {},
+            "placeholders": {},
+            "options": {}
+        }
+
+        steps_by_number: Dict[int, Dict[str, Any]] = {}
+        for job in self.queue.results(FORM_UNIT):
+            for step in job["result"].get("steps", []):
+                steps_by_number.setdefault(step["step"], step)
+        schema["steps"] = [steps_by_number[n] for n in sorted(steps_by_number)]
+
+        # Dependent lists are keyed by parent value, e.g. dependent["district"]["bihar"]
+        dependent: Dict[str, Dict[str, List[Dict[str, Any]]]] = {}
+        for job in self.queue.results(OPTIONS_UNIT):
+            payload = job["payload"]
+            dependent.setdefault(payload["field"], {})[payload["parent_value"]] = \
+                load_options(job["result"]) or []
+
+        for step in schema["steps"]:
+            for field in step.get("fields", []):
+                if field.get("name") in dependent:
+                    _merge_dependent_options(field, DEPENDENT_FIELDS[field["name"]], dependent[field["name"]])
+
+        return schema
+
+
+def _merge_dependent_options(field: Dict[str, Any], parent: str,
+                             by_parent: Dict[str, List[Dict[str, Any]]]):
+    """
+    Fold per-parent option lists into the child field itself, so everything that reads
+    `load_options(field)` sees them: `options` becomes the union over all parent values
+    and `optionsByParent` keeps which values belong to which parent value.
+    """
+    options: Dict[Any, Dict[str, Any]] = {}
+    for option in load_options(field) or []:
+        options.setdefault(option.get("value"), option)
+    for parent_options in by_parent.values():
+        for option in parent_options:
+            options.setdefault(option.get("value"), option)
+
+    field["options"] = list(options.values())
+    field.pop("options_file", None)
+    field.pop("option_count", None)
+    field["dependsOn"] = parent
+    field["optionsByParent"] = {
+        parent_value: [o["value"] for o in parent_options if o.get("value")]
+        for parent_value, parent_options in by_parent.items()
+    }
+
+
+class ScrapeWorker:
+    def __init__(self, queue: JobQueue, worker_id: Optional[str] = None,
+                 scraper_factory: Callable[[], UdyamScraper] = UdyamScraper,
+                 lease_seconds: float = 300):
+        """
+        Claim scrape units from the queue and run them with a lazily started scraper.
+
+        The default factory throttles as if this were the only worker; when running
+        several, pass scrapers built with `worker_controller(n)` to share the budget.
+        """
+        self.queue = queue
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.scraper_factory = scraper_factory
+        self.lease_seconds = lease_seconds
+        self.scraper: Optional[UdyamScraper] = None
+
+    def run(self, poll_interval: float = 2.0, idle_timeout: Optional[float] = 30.0) -> int:
+        """
+        Process units until the queue has been drained for `idle_timeout` seconds
+        (None keeps polling forever); returns the number completed.
+
+        The grace period covers the gap between a form unit finishing and the
+        coordinator enqueueing its dependent option units.
+        """
+        completed = 0
+        idle_since = None
+        try:
+            while True:
+                job = self.queue.claim(self.worker_id, self.lease_seconds)
+                if job is None:
+                    if self.queue.is_drained():
+                        idle_since = idle_since or time.monotonic()
+                        if idle_timeout is not None and time.monotonic() - idle_since >= idle_timeout:
+                            break
+                    else:
+                        idle_since = None
+                    time.sleep(poll_interval)
+                    continue
+
+                idle_since = None
+                if self._process(job):
+                    completed += 1
+        finally:
+            if self.scraper is not None:
+                self.scraper.close()
+
+        logger.info(f"Worker {self.worker_id} completed {completed} units")
+        return completed
+
+    def _process(self, job: Dict[str, Any]) -> bool:
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job["id"], stop), daemon=True)
+        heartbeat.start()
+        try:
+            result = self._run_unit(job["kind"], job["payload"])
+        except Exception as e:
+            stop.set()
+            heartbeat.join()
+            logger.error(f"Unit {job['key']} failed (attempt {job['attempts']}): {e}")
+            self.queue.fail(job["id"], self.worker_id, str(e))
+            return False
+
+        stop.set()
+        heartbeat.join()
+        if not self.queue.complete(job["id"], self.worker_id, result):
+            logger.warning(f"Lease on {job['key']} was lost; result discarded")
+            return False
+        return True
+
+    def _heartbeat(self, job_id: int, stop: threading.Event):
+        while not stop.wait(self.lease_seconds / 3):
+            self.queue.heartbeat(job_id, self.worker_id, self.lease_seconds)
+
+    def _run_unit(self, kind: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        if self.scraper is None:
+            self.scraper = self.scraper_factory()
+
+        if kind == FORM_UNIT:
+            self.scraper.base_url = payload["url"]
+            self.scraper.schema["steps"] = []
+            # scrape_form_fields logs and swallows errors, so an empty result is the failure signal
+            steps = self.scraper.scrape_form_fields()["steps"]
+            if not steps:
+                raise RuntimeError(f"No form steps scraped from {payload['url']}")
+            return {"steps": steps}
+        if kind == OPTIONS_UNIT:
+            result = self.scraper.extract_dependent_options(
+                payload["url"], payload["parent"], payload["parent_value"], payload["field"]
+            )
+            # Streamed option files live on this worker's disk, so results always carry them inline
+            return {"options": load_options(result) or []}
+        raise ValueError(f"Unknown scrape unit kind: {kind}")
+
+
+def main():
+    """Run a coordinator or a worker against a shared queue"""
+    parser = argparse.ArgumentParser(description="Distributed Udyam form scraping")
+    parser.add_argument("role", choices=["coordinator", "worker"])
+    parser.add_argument("--queue", default="scrape_queue.db", help="SQLite queue database")
+    parser.add_argument("--output", default="udyam_form_schema.json", help="Merged schema file")
+    parser.add_argument("--worker-id", default=None)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Total workers scraping concurrently; each gets 1/N of the portal budget")
+    args = parser.parse_args()
+
+    queue = SQLiteJobQueue(args.queue)
+    try:
+        if args.role == "coordinator":
+            schema = ScrapeCoordinator(queue).run()
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(schema, f, indent=2, ensure_ascii=False)
+            logger.info(f"Merged schema saved to {args.output} ({queue.counts()})")
+        else:
+            ScrapeWorker(queue, worker_id=args.worker_id,
+                         scraper_factory=lambda: UdyamScraper(controller=worker_controller(args.workers))).run()
+    finally:
+        queue.close()
+
+if __name__ == "__main__":
+    main()
@@ -9,21 +9,68 @@ import json
 import re
 from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support.ui import WebDriverWait, Select
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
 import time
-from typing import Dict, List, Any
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Iterator, Sequence, Tuple
 import logging
+from selenium.common.exceptions import TimeoutException
+from throttle import PortalRequestController, RateLimitedError, default_controller
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Options fetched per script call; keeps each WebDriver response bounded for huge selects
+OPTION_CHUNK_SIZE = 5000
+
+# Returns [total, values, texts] for options[start:end] in a single round trip
+OPTION_CHUNK_SCRIPT = """
+const select = arguments[0];
+const total = select.options.length;
+const end = Math.min(arguments[2], total);
+const values = [];
+const texts = [];
+for (let i = arguments[1]; i < end; i++) {
+  values.push(select.options[i].value);
+  texts.push(select.options[i].text);
+}
+return [total, values, texts];
+"""
+
+# HTTP status of the last navigation (Navigation Timing Level 2; 0 when the browser hides it)
+NAVIGATION_STATUS_SCRIPT = """
+const entries = performance.getEntriesByType('navigation');
+return entries.length ? (entries[entries.length - 1].responseStatus || 0) : 0;
+"""
+
+# Common field selectors for Udyam registration
+FIELD_SELECTORS = [
+    "input[type='text']",
+    "input[type='password']",
+    "input[type='email']",
+    "input[type='tel']",
+    "select",
+    "textarea",
+    "input[type='radio']",
+    "input[type='checkbox']"
+]
+
 class UdyamScraper:
-    def __init__(self, headless: bool = True):
+    def __init__(self, headless: bool = True, base_url: Optional[str] = None,
+                 controller: Optional[PortalRequestController] = None,
+                 option_stream_dir: Optional[str] = None,
+                 option_stream_threshold: int = 1000,
+                 chrome_arguments: Sequence[str] = ()):
         """Initialize the scraper with Chrome WebDriver"""
-        self.base_url = "https://udyamregistration.gov.in/UdyamRegistration.aspx"
+        self.base_url = base_url or "https://udyamregistration.gov.in/UdyamRegistration.aspx"
+        # Scrapers without their own controller share the process-wide rate/concurrency budget
+        self.controller = controller or default_controller()
+        # Selects with more options than the threshold are streamed to JSONL files here
+        self.option_stream_dir = Path(option_stream_dir) if option_stream_dir else None
+        self.option_stream_threshold = option_stream_threshold
         self.schema = {
             "steps": [],
             "validation_rules": {},
@@ -41,6 +88,8 @@ class UdyamScraper:
         chrome_options.add_argument("--disable-dev-shm-usage")
         chrome_options.add_argument("--disable-gpu")
         chrome_options.add_argument("--window-size=1920,1080")
+        for argument in chrome_arguments:
+            chrome_options.add_argument(argument)
         
         try:
             self.driver = webdriver.Chrome(options=chrome_options)
@@ -51,8 +100,7 @@ class UdyamScraper:
     def scrape_form_fields(self) -> Dict[str, Any]:
         """Scrape the main form fields and structure"""
         try:
-            logger.info(f"Navigating to {self.base_url}")
-            self.driver.get(self.base_url)
+            self.navigate(self.base_url)
             
             # Wait for page to load
             WebDriverWait(self.driver, 10).until(
@@ -82,24 +130,48 @@ class UdyamScraper:
             logger.error(f"Error scraping form fields: {e}")
             return self.schema
     
+    def navigate(self, url: str):
+        """Load a page through the shared request controller"""
+        logger.info(f"Navigating to {url}")
+        self.controller.call(url, self._load_page, url)
+    
+    def _load_page(self, url: str):
+        """driver.get returns nothing, so read the response status back from the page"""
+        self.driver.get(url)
+        if self.driver.execute_script(NAVIGATION_STATUS_SCRIPT) == 429:
+            raise RateLimitedError(f"429 from {url}")
+    
+    def extract_dependent_options(self, url: str, parent_name: str, parent_value: str,
+                                  field_name: str) -> Dict[str, Any]:
+        """Select a parent value (e.g. a state) and extract the child select's options"""
+        self.navigate(url)
+        WebDriverWait(self.driver, 10).until(
+            EC.presence_of_element_located((By.NAME, parent_name))
+        )
+        
+        # Selecting the parent triggers a postback, so it is throttled like a page load
+        self.controller.call(url, self._postback_select, parent_name, parent_value, field_name)
+        child = self.driver.find_element(By.NAME, field_name)
+        return self._extract_select_options(child, f"{field_name}.{parent_value}")
+    
+    def _postback_select(self, parent_name: str, parent_value: str, field_name: str):
+        """Select a parent value and wait for the postback to repopulate the child select"""
+        Select(self.driver.find_element(By.NAME, parent_name)).select_by_value(parent_value)
+        try:
+            WebDriverWait(self.driver, 10).until(
+                lambda d: len(Select(d.find_element(By.NAME, field_name)).options) > 1
+            )
+        except TimeoutException:
+            if self.driver.execute_script(NAVIGATION_STATUS_SCRIPT) == 429:
+                raise RateLimitedError(f"429 from postback on {parent_name}")
+            raise
+    
     def _extract_step1_fields(self) -> List[Dict[str, Any]]:
         """Extract fields from Step 1 (Aadhaar Details)"""
         fields = []
         
         try:
-            # Common field selectors for Udyam registration
-            field_selectors = [
-                "input[type='text']",
-                "input[type='password']",
-                "input[type='email']",
-                "input[type='tel']",
-                "select",
-                "textarea",
-                "input[type='radio']",
-                "input[type='checkbox']"
-            ]
-            
-            for selector in field_selectors:
+            for selector in FIELD_SELECTORS:
                 elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
                 for element in elements:
                     field_data = self._extract_field_data(element)
@@ -157,14 +229,7 @@ class UdyamScraper:
             
             # For select elements, extract options
             if element.tag_name == "select":
-                options = []
-                option_elements = element.find_elements(By.TAG_NAME, "option")
-                for option in option_elements:
-                    options.append({
-                        "value": option.get_attribute("value"),
-                        "text": option.text
-                    })
-                field_data["options"] = options
+                field_data.update(self._extract_select_options(element, field_data["name"]))
             
             return field_data
             
@@ -172,6 +237,46 @@ class UdyamScraper:
             logger.error(f"Error extracting field data: {e}")
             return None
     
+    def _iter_option_chunks(self, element) -> Iterator[Tuple[int, List[str], List[str]]]:
+        """Yield (total, values, texts) for a select, one script call per chunk"""
+        start = 0
+        while True:
+            total, values, texts = self.driver.execute_script(
+                OPTION_CHUNK_SCRIPT, element, start, start + OPTION_CHUNK_SIZE
+            )
+            yield total, values, texts
+            start += len(values)
+            if not values or start >= total:
+                break
+    
+    def _extract_select_options(self, element, field_name: str) -> Dict[str, Any]:
+        """Extract select options in bulk, streaming very large lists to disk"""
+        chunks = self._iter_option_chunks(element)
+        total, values, texts = next(chunks)
+        
+        if self.option_stream_dir is None or total <= self.option_stream_threshold:
+            options = [{"value": v, "text": t} for v, t in zip(values, texts)]
+            for _, values, texts in chunks:
+                options.extend({"value": v, "text": t} for v, t in zip(values, texts))
+            return {"options": options}
+        
+        self.option_stream_dir.mkdir(parents=True, exist_ok=True)
+        safe_name = re.sub(r"[^A-Za-z0-9_.-]", "_", field_name) or "select"
+        options_file = self.option_stream_dir / f"{safe_name}.options.jsonl"
+        
+        with open(options_file, 'w', encoding='utf-8') as f:
+            while True:
+                for v, t in zip(values, texts):
+                    f.write(json.dumps({"value": v, "text": t}, ensure_ascii=False))
+                    f.write("\n")
+                try:
+                    _, values, texts = next(chunks)
+                except StopIteration:
+                    break
+        
+        logger.info(f"Streamed {total} options for {field_name} to {options_file}")
+        return {"options_file": str(options_file), "option_count": total}
+    
     def _find_label_for_field(self, element) -> str:
         """Find the label associated with a form field"""
         try:
@@ -459,6 +564,7 @@ def main():
         scraper.save_schema()
         
         logger.info("Scraping completed successfully!")
+        scraper.controller.log_metrics()
         logger.info(f"Extracted {len(schema['steps'])} steps")
         
         for step in schema['steps']:
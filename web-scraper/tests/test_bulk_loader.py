@@ -0,0 +1,144 @@
+"""
+Tests for checkpointed bulk loading: resuming after a failed batch and reusing a work directory
+"""
+
+import json
+import os
+import sqlite3
+
+import pytest
+
+import bulk_loader
+from bulk_loader import TABLE_NAME, BulkLoader, SQLiteBackend, load_parallel
+from field_rules import RecordValidator
+
+SCHEMA = {
+    "steps": [
+        {
+            "step": 1,
+            "title": "Aadhaar Details",
+            "fields": [
+                {
+                    "name": "aadhaarNumber",
+                    "type": "text",
+                    "required": True,
+                    "validation": {"required": True, "pattern": "^[0-9]{12}$", "minLength": 12, "maxLength": 12}
+                }
+            ]
+        }
+    ]
+}
+
+
+def write_dump(path, count, invalid_every=0, offset=0):
+    """Write `count` records; every `invalid_every`-th one has a malformed Aadhaar number"""
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(count):
+            invalid = invalid_every and i % invalid_every == 0
+            aadhaar = "bad" if invalid else f"{offset + i:012d}"
+            f.write(json.dumps({"aadhaarNumber": aadhaar, "enterpriseName": f"Enterprise {i}"}) + "\n")
+
+
+def row_count(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM {TABLE_NAME}").fetchone()[0]
+
+
+def read_rejects(path):
+    data = open(path, 'rb').read()
+    assert b"\0" not in data
+    return data.decode().splitlines()
+
+
+class FailingBackend(SQLiteBackend):
+    """SQLite backend whose n-th upsert raises, standing in for a crashed load"""
+
+    def __init__(self, path, fail_on):
+        super().__init__(path)
+        self.fail_on = fail_on
+        self.calls = 0
+
+    def upsert(self, rows):
+        self.calls += 1
+        if self.calls == self.fail_on:
+            raise RuntimeError("connection lost")
+        super().upsert(rows)
+
+
+@pytest.fixture
+def loader_factory(tmp_path):
+    db = str(tmp_path / "load.db")
+    SQLiteBackend(db).ensure_schema()
+
+    def make(backend=None):
+        return BulkLoader(
+            backend or SQLiteBackend(db), RecordValidator(SCHEMA), batch_size=10,
+            checkpoint_file=str(tmp_path / "load.checkpoint"),
+            rejects_file=str(tmp_path / "load.rejects.jsonl")
+        )
+
+    make.db = db
+    make.rejects = str(tmp_path / "load.rejects.jsonl")
+    return make
+
+
+def test_resume_after_failed_batch_keeps_rejects_exact(tmp_path, loader_factory):
+    source = str(tmp_path / "dump.jsonl")
+    write_dump(source, 100, invalid_every=7)
+
+    with pytest.raises(RuntimeError):
+        loader_factory(FailingBackend(loader_factory.db, fail_on=4)).load(source)
+    resumed = loader_factory().load(source)
+
+    assert resumed["skipped"] > 0
+    assert row_count(loader_factory.db) == 85
+    rejects = read_rejects(loader_factory.rejects)
+    assert len(rejects) == 15
+    assert len(set(rejects)) == 15
+
+
+def test_new_source_at_same_path_loads_from_scratch(tmp_path, loader_factory):
+    source = str(tmp_path / "dump.jsonl")
+    write_dump(source, 50, invalid_every=5)
+    assert loader_factory().load(source)["loaded"] == 40
+
+    write_dump(source, 60, offset=1000)
+    stats = loader_factory().load(source)
+    assert stats == {"loaded": 60, "rejected": 0, "skipped": 0}
+    assert read_rejects(loader_factory.rejects) == []
+
+    # A rerun of the finished load writes nothing and leaves the rejects file valid
+    assert loader_factory().load(source) == {"loaded": 0, "rejected": 0, "skipped": 60}
+    assert read_rejects(loader_factory.rejects) == []
+    checkpoint = json.loads(open(tmp_path / "load.checkpoint").read())
+    assert checkpoint["rejects_bytes"] == os.path.getsize(loader_factory.rejects) == 0
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_new_dump_in_existing_work_dir(tmp_path, workers):
+    schema_file = str(tmp_path / "schema.json")
+    with open(schema_file, 'w', encoding='utf-8') as f:
+        json.dump(SCHEMA, f)
+    db = str(tmp_path / "load.db")
+    work_dir = str(tmp_path / "work")
+    source = str(tmp_path / "dump.jsonl")
+
+    write_dump(source, 40, invalid_every=4)
+    first = load_parallel(source, workers, work_dir, schema_file, batch_size=10, sqlite_path=db)
+    assert (first["loaded"], first["rejected"]) == (30, 10)
+
+    write_dump(source, 25, offset=5000)
+    second = load_parallel(source, workers, work_dir, schema_file, batch_size=10, sqlite_path=db)
+    assert second == {"loaded": 25, "rejected": 0, "skipped": 0}
+    assert row_count(db) == 55
+
+    rejects = [p for p in os.listdir(work_dir) if p.endswith(".rejects.jsonl")]
+    assert all(read_rejects(os.path.join(work_dir, p)) == [] for p in rejects)
+
+
+def test_source_fingerprint_changes_with_contents(tmp_path):
+    source = str(tmp_path / "dump.jsonl")
+    write_dump(source, 3)
+    before = bulk_loader.source_fingerprint(source)
+    write_dump(source, 4)
+    assert bulk_loader.source_fingerprint(source) != before
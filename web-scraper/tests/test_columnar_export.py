@@ -0,0 +1,57 @@
+"""
+Tests for the Parquet export: digit parsing, rejected records and the fallback column types
+"""
+
+import json
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+
+from columnar_export import WIDTH_METADATA, derive_arrow_schema, export_submissions, read_submissions
+
+
+def write_dump(path, records):
+    with open(path, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+
+def test_fallback_schema_types_every_column():
+    schema = derive_arrow_schema({"steps": []})
+    assert schema.field("pincode").type == pa.uint32()
+    assert schema.field("pincode").metadata[WIDTH_METADATA] == b"6"
+    assert schema.field("aadhaarNumber").type == pa.uint64()
+    assert schema.field("createdAt").type == pa.timestamp("ms", tz="UTC")
+    assert schema.field("currentStep").type == pa.int8()
+
+
+def test_digit_values_are_normalized_or_rejected(tmp_path):
+    source = str(tmp_path / "dump.jsonl")
+    rejects = tmp_path / "rejects.jsonl"
+    write_dump(source, [
+        {"aadhaarNumber": "1234 5678 9012", "pincode": "011001", "state": "delhi", "currentStep": 2},
+        {"aadhaarNumber": "-12345678901", "pincode": "560001", "state": "goa"},
+        {"aadhaarNumber": "123456789012", "pincode": "56 0001", "state": "goa", "currentStep": 300},
+        {"aadhaarNumber": "", "pincode": None, "state": "goa"}
+    ])
+
+    stats = export_submissions(source, str(tmp_path / "out"), {"steps": []}, rejects_file=str(rejects))
+
+    assert stats == {"exported": 2, "rejected": 2}
+    rejected = [json.loads(line) for line in rejects.read_text().splitlines()]
+    assert [sorted(r["errors"]) for r in rejected] == [["aadhaarNumber"], ["currentStep"]]
+
+    df = read_submissions(str(tmp_path / "out"), {"steps": []}, filters={"aadhaarNumber": "1234 5678 9012"})
+    assert df["aadhaarNumber"].tolist() == ["123456789012"]
+    assert df["pincode"].tolist() == ["011001"]
+
+
+def test_non_empty_output_requires_overwrite(tmp_path):
+    source = str(tmp_path / "dump.jsonl")
+    write_dump(source, [{"aadhaarNumber": "123456789012", "state": "goa"}])
+    export_submissions(source, str(tmp_path / "out"), {"steps": []})
+
+    with pytest.raises(FileExistsError):
+        export_submissions(source, str(tmp_path / "out"), {"steps": []})
+    assert export_submissions(source, str(tmp_path / "out"), {"steps": []}, overwrite=True)["exported"] == 1
@@ -0,0 +1,132 @@
+"""
+Tests for the SQLite job queue's leases, retries and expiry, driven by a fake clock
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+import job_queue
+from job_queue import DONE, FAILED, LEASED, PENDING, SQLiteJobQueue
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(job_queue, "time", SimpleNamespace(time=fake.time))
+    return fake
+
+
+@pytest.fixture
+def queue(tmp_path, clock):
+    q = SQLiteJobQueue(str(tmp_path / "queue.db"))
+    yield q
+    q.close()
+
+
+def test_enqueue_deduplicates_by_key(queue):
+    assert queue.enqueue("form", {"url": "a"}, key="form:a")
+    assert not queue.enqueue("form", {"url": "b"}, key="form:a")
+    assert queue.counts() == {PENDING: 1}
+
+
+def test_claim_leases_each_job_once(queue):
+    queue.enqueue("form", {"url": "a"}, key="a")
+    job = queue.claim("w1", lease_seconds=60)
+    assert (job["key"], job["payload"], job["attempts"]) == ("a", {"url": "a"}, 1)
+    assert queue.claim("w2", lease_seconds=60) is None
+    assert queue.counts() == {LEASED: 1}
+
+
+def test_expired_lease_is_reclaimed_and_old_owner_loses_it(queue, clock):
+    queue.enqueue("form", {}, key="a")
+    first = queue.claim("w1", lease_seconds=60)
+
+    clock.advance(61)
+    second = queue.claim("w2", lease_seconds=60)
+    assert second["id"] == first["id"]
+    assert second["attempts"] == 2
+
+    assert not queue.heartbeat(first["id"], "w1", 60)
+    assert not queue.complete(first["id"], "w1", {"from": "w1"})
+    assert not queue.fail(first["id"], "w1", "late")
+    assert queue.complete(second["id"], "w2", {"from": "w2"})
+    assert [job["result"] for job in queue.results()] == [{"from": "w2"}]
+
+
+def test_heartbeat_extends_lease(queue, clock):
+    queue.enqueue("form", {}, key="a")
+    job = queue.claim("w1", lease_seconds=60)
+
+    clock.advance(50)
+    assert queue.heartbeat(job["id"], "w1", 60)
+    clock.advance(50)
+    assert queue.claim("w2", lease_seconds=60) is None
+    assert queue.complete(job["id"], "w1", {})
+    assert queue.counts() == {DONE: 1}
+
+
+def test_failed_job_retries_with_exponential_backoff(queue, clock):
+    queue.enqueue("form", {}, key="a", max_attempts=3)
+
+    job = queue.claim("w1")
+    assert queue.fail(job["id"], "w1", "boom", retry_delay=5)
+    clock.advance(4.9)
+    assert queue.claim("w1") is None
+    clock.advance(0.1)
+    job = queue.claim("w1")
+    assert job["attempts"] == 2
+
+    assert queue.fail(job["id"], "w1", "boom", retry_delay=5)
+    clock.advance(9.9)
+    assert queue.claim("w1") is None
+    clock.advance(0.1)
+    assert queue.claim("w1")["attempts"] == 3
+
+
+def test_failure_on_last_attempt_marks_job_failed(queue, clock):
+    queue.enqueue("form", {}, key="a", max_attempts=2)
+    for _ in range(2):
+        job = queue.claim("w1")
+        assert queue.fail(job["id"], "w1", "boom", retry_delay=1)
+        clock.advance(10)
+
+    assert queue.claim("w1") is None
+    assert queue.counts() == {FAILED: 1}
+    assert queue.is_drained()
+
+
+def test_expired_lease_on_last_attempt_marks_job_failed(queue, clock):
+    queue.enqueue("form", {}, key="a", max_attempts=1)
+    queue.claim("w1", lease_seconds=60)
+    assert not queue.is_drained()
+
+    clock.advance(61)
+    assert queue.claim("w2", lease_seconds=60) is None
+    assert queue.counts() == {FAILED: 1}
+    error = queue.conn.execute("SELECT error FROM jobs").fetchone()["error"]
+    assert error == "lease expired"
+
+
+def test_results_filter_by_kind(queue):
+    queue.enqueue("form", {"n": 1}, key="f")
+    queue.enqueue("options", {"n": 2}, key="o")
+    while True:
+        job = queue.claim("w1")
+        if job is None:
+            break
+        queue.complete(job["id"], "w1", {"kind": job["kind"]})
+
+    assert [job["payload"] for job in queue.results("options")] == [{"n": 2}]
+    assert len(queue.results()) == 2
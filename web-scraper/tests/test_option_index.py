@@ -0,0 +1,55 @@
+"""
+Tests for the autocomplete index: results against a brute-force scan and artifact size
+"""
+
+import json
+import random
+
+import pytest
+
+from option_index import OptionIndex, decode_posting, encode_posting, normalize
+
+
+@pytest.fixture(scope="module")
+def options():
+    rng = random.Random(7)
+    vocab = ["".join(rng.choice("abcdefghiklmnoprstuvw") for _ in range(rng.randint(3, 10))) for _ in range(800)]
+    return [
+        {"value": f"{i:05d}", "text": " ".join(rng.choice(vocab) for _ in range(rng.randint(2, 7))).title()}
+        for i in range(5000)
+    ]
+
+
+def test_posting_round_trip():
+    ids = [0, 1, 2, 31, 32, 1023, 1024, 40000, 10 ** 7]
+    assert decode_posting(encode_posting(ids)) == ids
+
+
+def test_search_matches_brute_force(tmp_path, options):
+    path = str(tmp_path / "index.json")
+    OptionIndex.build(options).save(path)
+    index = OptionIndex.load(path)
+
+    normalized = [normalize(o["text"]) for o in options]
+    words = sorted({w for text in normalized for w in text.split()})
+    queries = [w[:2] for w in words[:20]] + [w[1:5] for w in words[20:40]]
+    queries += [normalize(o["text"])[3:14] for o in options[:20]]
+
+    for query in queries:
+        q = normalize(query)
+        at_start = [i for i, text in enumerate(normalized) if text.startswith(q) or f" {q}" in text]
+        anywhere = [i for i, text in enumerate(normalized) if q in text]
+        found = [int(o["value"]) for o in index.search(query, limit=10)]
+
+        assert len(found) == len(set(found)) == min(10, len(anywhere if len(q) >= 3 else at_start))
+        assert all(q in normalized[i] for i in found)
+        # Word-prefix matches are listed before substring matches
+        prefix_hits = [i in at_start for i in found]
+        assert prefix_hits == sorted(prefix_hits, reverse=True)
+        assert sum(prefix_hits) == min(10, len(at_start))
+
+
+def test_artifact_is_smaller_than_raw_options(tmp_path, options):
+    path = tmp_path / "index.json"
+    OptionIndex.build(options).save(str(path))
+    assert path.stat().st_size < len(json.dumps(options))
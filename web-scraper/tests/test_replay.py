@@ -0,0 +1,156 @@
+"""
+Tests for record and replay against local portal and asset servers
+"""
+
+import shutil
+import threading
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from replay import ArchiveServer, ScrapeArchive
+
+
+class LocalSite:
+    """Local HTTP server answering every GET with the body produced by `page(path)`"""
+
+    def __init__(self, page, content_type="text/html"):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/moved":
+                    self.send_response(302)
+                    self.send_header("Location", page("/moved").decode())
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                body = page(self.path)
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        self.origin = f"http://127.0.0.1:{self.httpd.server_port}"
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+def fetch(url):
+    try:
+        response = urllib.request.build_opener(_NoRedirect).open(url, timeout=10)
+    except urllib.error.HTTPError as e:
+        response = e
+    with response:
+        return response.code, response.headers, response.read()
+
+
+@pytest.fixture
+def sites():
+    cdn = LocalSite(lambda path: f"asset {path}".encode(), "application/javascript")
+    portal = None
+
+    def page(path):
+        if path == "/moved":
+            return f"{portal.origin}/form".encode()
+        return (
+            f'<a href="{portal.origin}/form">form</a>'
+            f'<script src="{cdn.origin}/lib/app.js"></script>'
+        ).encode()
+
+    portal = LocalSite(page)
+    yield portal, cdn
+    portal.stop()
+    cdn.stop()
+
+
+def record(archive_path, portal, paths):
+    archive = ScrapeArchive(archive_path, "w")
+    server = ArchiveServer(archive, upstream=portal.origin).start()
+    responses = {path: fetch(server.origin + path) for path in paths}
+    server.stop()
+    return archive, responses
+
+
+def test_portal_origin_is_rewritten_in_every_spelling(tmp_path):
+    archive = ScrapeArchive(str(tmp_path / "unused.zip"), "w")
+    server = ArchiveServer(archive, upstream="https://udyamregistration.gov.in")
+    try:
+        page = (
+            b'<a href="https://udyamregistration.gov.in/a">'
+            b'<a href="//udyamregistration.gov.in/b">'
+            b'<a href="https://udyamregistration.gov.in:443/c">'
+            b'<a href="HTTP://UdyamRegistration.gov.in">'
+            b'<a href="https://udyamregistration.gov.in.example.com/d">'
+            b'<img src="https://cdn.example.com/logo.png">'
+            b'<style>body { background: url(//fonts.example.com/bg.png) }</style>'
+        )
+        assert server._rewrite_body(page) == (
+            b'<a href="/a">'
+            b'<a href="/b">'
+            b'<a href="/c">'
+            b'<a href="/">'
+            b'<a href="/__external__/https/udyamregistration.gov.in.example.com/d">'
+            b'<img src="/__external__/https/cdn.example.com/logo.png">'
+            b'<style>body { background: url(/__external__/https/fonts.example.com/bg.png) }</style>'
+        )
+        assert server._rewrite_location("https://udyamregistration.gov.in:443/x?y=1") == "/x?y=1"
+        assert server._rewrite_location("https://sso.example.com/login") == "/__external__/https/sso.example.com/login"
+    finally:
+        server.httpd.server_close()
+        archive.close()
+
+
+def test_replay_serves_portal_and_external_assets_offline(tmp_path, sites):
+    portal, cdn = sites
+    archive_path = str(tmp_path / "scrape.zip")
+    # The asset is requested the way the browser follows the rewritten link
+    asset_path = f"/__external__/http/127.0.0.1:{cdn.httpd.server_port}/lib/app.js"
+    archive, recorded = record(archive_path, portal, ["/", "/moved", asset_path])
+    archive.close()
+    portal.stop()
+    cdn.stop()
+
+    page = recorded["/"][2]
+    assert portal.origin.encode() not in page
+    assert cdn.origin.encode() not in page
+    assert asset_path.encode() in page
+    assert recorded["/moved"][1]["Location"] == "/form"
+    assert recorded[asset_path][2] == b"asset /lib/app.js"
+
+    replay = ArchiveServer(ScrapeArchive(archive_path, "r")).start()
+    try:
+        assert fetch(replay.origin + "/")[2] == page
+        assert fetch(replay.origin + asset_path)[2] == b"asset /lib/app.js"
+    finally:
+        replay.stop()
+
+
+def test_killed_recording_is_still_readable(tmp_path, sites):
+    portal, _ = sites
+    archive_path = str(tmp_path / "scrape.zip")
+    killed_path = str(tmp_path / "killed.zip")
+    archive, recorded = record(archive_path, portal, ["/", "/moved"])
+
+    # A copy taken before close() has no central directory and no manifest
+    shutil.copy(archive_path, killed_path)
+    archive.close()
+
+    salvaged = ScrapeArchive(killed_path, "r")
+    assert [(e["method"], e["path"]) for e in salvaged.exchanges] == [("GET", "/"), ("GET", "/moved")]
+    exchange, body = salvaged.lookup("GET", "/", b"")
+    assert body == recorded["/"][2]
+    assert exchange["status"] == 200
@@ -0,0 +1,61 @@
+"""
+Tests for merging distributed scrape results into one schema
+"""
+
+import pytest
+
+scrape_workers = pytest.importorskip("scrape_workers")
+
+from field_rules import RecordValidator
+from job_queue import SQLiteJobQueue
+from option_index import load_options
+
+
+def select(name, values):
+    return {
+        "name": name,
+        "type": "select",
+        "options": [{"value": "", "text": "Select"}] + [{"value": v, "text": v.title()} for v in values]
+    }
+
+
+@pytest.fixture
+def merged(tmp_path):
+    queue = SQLiteJobQueue(str(tmp_path / "queue.db"))
+    coordinator = scrape_workers.ScrapeCoordinator(queue, base_url="http://portal/form")
+    coordinator.seed()
+    job = queue.claim("w1")
+    queue.complete(job["id"], "w1", {
+        "steps": [{"step": 1, "title": "Details", "fields": [select("state", ["bihar", "goa"]), select("district", [])]}]
+    })
+    coordinator.expand()
+    districts = {"bihar": ["patna", "gaya"], "goa": ["north goa", "patna"]}
+    while True:
+        job = queue.claim("w1")
+        if job is None:
+            break
+        values = districts[job["payload"]["parent_value"]]
+        queue.complete(job["id"], "w1", {"options": select("district", values)["options"]})
+
+    schema = coordinator.merge()
+    queue.close()
+    return schema
+
+
+def test_dependent_options_are_merged_into_the_child_field(merged):
+    district = next(f for f in merged["steps"][0]["fields"] if f["name"] == "district")
+    assert [o["value"] for o in load_options(district)] == ["", "patna", "gaya", "north goa"]
+    assert district["dependsOn"] == "state"
+    assert district["optionsByParent"] == {"bihar": ["patna", "gaya"], "goa": ["north goa", "patna"]}
+    assert merged["options"] == {}
+
+
+def test_validator_checks_district_against_the_selected_state(merged):
+    validator = RecordValidator(merged)
+    assert validator.validate({"state": "bihar", "district": "gaya"}) == {}
+    assert validator.validate({"state": "goa", "district": "gaya"}) == {
+        "district": "Not an option for the selected state"
+    }
+    assert validator.validate({"state": "goa", "district": "pune"}) == {
+        "district": "Not one of the allowed options"
+    }
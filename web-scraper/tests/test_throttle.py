@@ -0,0 +1,153 @@
+"""
+Tests for the portal request controller against a local server with injected latency
+"""
+
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+from throttle import AdaptiveConcurrencyLimiter, PortalRequestController, RateLimitedError, default_controller
+
+
+class FakePortal:
+    """Local HTTP server whose latency and 429 responses can be changed mid-test"""
+
+    def __init__(self):
+        self.delay = 0.0
+        self.rate_limited_responses = 0
+        self._lock = threading.Lock()
+        portal = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                time.sleep(portal.delay)
+                with portal._lock:
+                    limited = portal.rate_limited_responses > 0
+                    if limited:
+                        portal.rate_limited_responses -= 1
+                self.send_response(429 if limited else 200)
+                self.send_header("Content-Length", "2")
+                self.end_headers()
+                self.wfile.write(b"ok")
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}/"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def fetch(self, url: str):
+        try:
+            with urllib.request.urlopen(url) as response:
+                response.read()
+                return SimpleNamespace(status_code=response.status)
+        except urllib.error.HTTPError as e:
+            return SimpleNamespace(status_code=e.code)
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def portal():
+    server = FakePortal()
+    yield server
+    server.close()
+
+
+def _run_parallel(controller, portal, threads: int, requests_each: int):
+    def worker():
+        for _ in range(requests_each):
+            controller.call(portal.url, portal.fetch, portal.url)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+
+
+def test_limit_grows_while_latency_is_stable(portal):
+    portal.delay = 0.02
+    controller = PortalRequestController(rate_per_host=1000, initial_concurrency=1, max_concurrency=8)
+
+    _run_parallel(controller, portal, threads=8, requests_each=20)
+
+    metrics = controller.metrics()
+    assert metrics["successes"] == 160
+    assert metrics["concurrency_limit"] > 1
+
+
+def test_backs_off_on_429(portal):
+    controller = PortalRequestController(rate_per_host=1000, initial_concurrency=8, retry_after=0.2)
+    portal.rate_limited_responses = 1
+
+    with pytest.raises(RateLimitedError):
+        controller.call(portal.url, portal.fetch, portal.url)
+
+    assert controller.limiter.limit == 4
+    assert controller.metrics()["rate_limited"] == 1
+
+    # The bucket was drained, so the next request waits out the retry_after penalty
+    started = time.monotonic()
+    controller.call(portal.url, portal.fetch, portal.url)
+    assert time.monotonic() - started >= 0.15
+
+
+def test_backs_off_on_slowdown(portal):
+    portal.delay = 0.01
+    controller = PortalRequestController(rate_per_host=1000, initial_concurrency=4)
+    for _ in range(10):
+        controller.call(portal.url, portal.fetch, portal.url)
+    limit_before = controller.limiter.limit
+
+    portal.delay = 0.2
+    for _ in range(3):
+        controller.call(portal.url, portal.fetch, portal.url)
+
+    assert controller.limiter.limit < limit_before
+
+
+def test_token_bucket_paces_requests(portal):
+    controller = PortalRequestController(rate_per_host=20, burst=1)
+
+    started = time.monotonic()
+    for _ in range(11):
+        controller.call(portal.url, portal.fetch, portal.url)
+
+    # One token up front, then one every 50ms
+    assert time.monotonic() - started >= 0.45
+
+
+def test_limit_decreases_at_most_once_per_window():
+    limiter = AdaptiveConcurrencyLimiter(initial=16, max_limit=16)
+    for _ in range(16):
+        limiter.acquire()
+
+    for _ in range(4):
+        limiter.release(overloaded=True)
+    assert limiter.limit == 8
+
+    # A full window (the new limit) of completions later, another cut is allowed
+    for _ in range(12):
+        limiter.release(latency=0.01)
+    limiter.acquire()
+    limiter.release(overloaded=True)
+    assert limiter.limit == 4
+
+
+def test_default_controller_is_shared_per_process():
+    controllers = []
+    threads = [threading.Thread(target=lambda: controllers.append(default_controller())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all(controller is default_controller() for controller in controllers)
@@ -0,0 +1,246 @@
+"""
+Request Throttling for the Udyam Registration portal
+Per-host token-bucket rate limiting combined with an adaptive concurrency limit
+"""
+
+import threading
+import time
+import logging
+from typing import Dict, Any, Callable, Optional
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitedError(Exception):
+    """Raised by a fetch callable when the portal signals throttling (e.g. HTTP 429)"""
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """Allow `rate` requests per second with bursts of up to `capacity`"""
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._updated = now
+
+    def acquire(self) -> float:
+        """Block until a token is available; returns the time spent waiting"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def penalize(self, seconds: float):
+        """Drain the bucket so no request is released for roughly `seconds`"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, 0) - seconds * self.rate
+
+
+class AdaptiveConcurrencyLimiter:
+    def __init__(self, initial: int = 2, min_limit: int = 1, max_limit: int = 16,
+                 latency_tolerance: float = 1.5, backoff_ratio: float = 0.5,
+                 smoothing: float = 0.2):
+        """
+        Additive-increase / multiplicative-decrease concurrency limit.
+
+        The limit grows by one after a full window of requests whose latency stays
+        within `latency_tolerance` of the best observed latency, and shrinks by
+        `backoff_ratio` on a slowdown, a 429 or a timeout. It shrinks at most once per
+        window, so a burst of slow responses already in flight counts as one signal.
+        """
+        self.limit = initial
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_tolerance = latency_tolerance
+        self.backoff_ratio = backoff_ratio
+        self.smoothing = smoothing
+
+        self.in_flight = 0
+        self.min_latency: Optional[float] = None
+        self.smoothed_latency: Optional[float] = None
+        self._successes_in_window = 0
+        # Requests completed since the last decrease; None until the first one
+        self._completed_since_decrease: Optional[int] = None
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """Block until a concurrency slot is free"""
+        with self._cond:
+            while self.in_flight >= self.limit:
+                self._cond.wait()
+            self.in_flight += 1
+
+    def release(self, latency: Optional[float] = None, overloaded: bool = False):
+        """Free a slot and adjust the limit from the outcome of the request"""
+        with self._cond:
+            self.in_flight -= 1
+            if self._completed_since_decrease is not None:
+                self._completed_since_decrease += 1
+
+            if overloaded:
+                self._decrease()
+            elif latency is not None:
+                self._observe(latency)
+
+            self._cond.notify_all()
+
+    def _observe(self, latency: float):
+        if self.min_latency is None or latency < self.min_latency:
+            self.min_latency = latency
+        if self.smoothed_latency is None:
+            self.smoothed_latency = latency
+        else:
+            self.smoothed_latency += self.smoothing * (latency - self.smoothed_latency)
+
+        if self.smoothed_latency > self.min_latency * self.latency_tolerance:
+            self._decrease()
+            # Let the baseline drift up so a permanently slower portal is not
+            # treated as overloaded forever
+            self.min_latency += self.smoothing * (self.smoothed_latency - self.min_latency)
+            return
+
+        self._successes_in_window += 1
+        if self._successes_in_window >= self.limit and self.limit < self.max_limit:
+            self.limit += 1
+            self._successes_in_window = 0
+
+    def _decrease(self):
+        self._successes_in_window = 0
+        if self._completed_since_decrease is not None and self._completed_since_decrease < self.limit:
+            return
+        self.limit = max(self.min_limit, int(self.limit * self.backoff_ratio))
+        self._completed_since_decrease = 0
+
+
+class PortalRequestController:
+    def __init__(self, rate_per_host: float = 2.0, burst: Optional[float] = None,
+                 initial_concurrency: int = 2, max_concurrency: int = 16,
+                 retry_after: float = 5.0):
+        """Shared gate that every portal fetch or page navigation goes through"""
+        self.rate_per_host = rate_per_host
+        self.burst = burst
+        self.retry_after = retry_after
+        self.limiter = AdaptiveConcurrencyLimiter(
+            initial=initial_concurrency, max_limit=max_concurrency
+        )
+
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+        self._metrics = {
+            "requests": 0,
+            "successes": 0,
+            "errors": 0,
+            "rate_limited": 0,
+            "timeouts": 0,
+            "total_latency": 0.0,
+            "total_wait": 0.0
+        }
+        self._started = time.monotonic()
+
+    def _bucket_for(self, host: str) -> TokenBucket:
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = TokenBucket(self.rate_per_host, self.burst)
+                self._buckets[host] = bucket
+            return bucket
+
+    def call(self, url: str, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run `func(*args, **kwargs)` as a throttled request against `url`'s host"""
+        bucket = self._bucket_for(urlparse(url).netloc)
+
+        wait_started = time.monotonic()
+        self.limiter.acquire()
+        bucket.acquire()
+        waited = time.monotonic() - wait_started
+
+        started = time.monotonic()
+        overloaded = False
+        failed = True
+        try:
+            result = func(*args, **kwargs)
+            if getattr(result, "status_code", None) == 429:
+                raise RateLimitedError(f"429 from {url}")
+            failed = False
+            return result
+        except RateLimitedError:
+            overloaded = True
+            bucket.penalize(self.retry_after)
+            self._record("rate_limited")
+            raise
+        except Exception as e:
+            if _is_timeout(e):
+                overloaded = True
+                self._record("timeouts")
+            self._record("errors")
+            raise
+        finally:
+            latency = time.monotonic() - started
+            self.limiter.release(latency=None if overloaded else latency, overloaded=overloaded)
+            with self._lock:
+                self._metrics["requests"] += 1
+                self._metrics["total_latency"] += latency
+                self._metrics["total_wait"] += waited
+                if not failed:
+                    self._metrics["successes"] += 1
+
+    def _record(self, key: str):
+        with self._lock:
+            self._metrics[key] += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        """Snapshot of live throughput, latency and concurrency figures"""
+        with self._lock:
+            snapshot = dict(self._metrics)
+        requests_done = snapshot["requests"] or 1
+        elapsed = time.monotonic() - self._started
+
+        snapshot["avg_latency"] = snapshot.pop("total_latency") / requests_done
+        snapshot["avg_wait"] = snapshot.pop("total_wait") / requests_done
+        snapshot["throughput"] = snapshot["requests"] / elapsed if elapsed > 0 else 0.0
+        snapshot["concurrency_limit"] = self.limiter.limit
+        snapshot["in_flight"] = self.limiter.in_flight
+        snapshot["min_latency"] = self.limiter.min_latency
+        return snapshot
+
+    def log_metrics(self):
+        """Log the current metrics snapshot"""
+        m = self.metrics()
+        logger.info(
+            f"requests={m['requests']} errors={m['errors']} 429s={m['rate_limited']} "
+            f"timeouts={m['timeouts']} limit={m['concurrency_limit']} "
+            f"avg_latency={m['avg_latency']:.3f}s throughput={m['throughput']:.2f}/s"
+        )
+
+
+_default_controller: Optional[PortalRequestController] = None
+_default_lock = threading.Lock()
+
+
+def default_controller() -> PortalRequestController:
+    """Process-wide controller, so scrapers created without one share a single budget"""
+    global _default_controller
+    with _default_lock:
+        if _default_controller is None:
+            _default_controller = PortalRequestController()
+        return _default_controller
+
+
+def _is_timeout(error: Exception) -> bool:
+    """Match timeout exceptions from requests, Selenium and the standard library"""
+    return isinstance(error, TimeoutError) or "Timeout" in type(error).__name__